@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import *
 from django.utils.html import format_html
+from .revisions import make_current
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
@@ -35,14 +36,28 @@ class InstructorAdmin(UserAdmin):
 
 @admin.register(TimeTableMain)
 class TimeTableMainAdmin(admin.ModelAdmin):
-    list_display = ('Programme', 'YearOfStudy', 'Semister', 'Department', 'registered_date_formatted')
-    list_filter = ('YearOfStudy', 'Semister', 'Department')
+    list_display = ('Programme', 'YearOfStudy', 'Semister', 'Department', 'TimeGrid', 'registered_date_formatted')
+    list_filter = ('YearOfStudy', 'Semister', 'Department', 'TimeGrid')
     search_fields = ('Programme',)
     
     def registered_date_formatted(self, obj):
         return format_html('<span class="badge bg-info">{}</span>', obj.RegisteredDate.strftime('%Y-%m-%d'))
     registered_date_formatted.short_description = 'Registered Date'
 
+class TimeGridSlotInline(admin.TabularInline):
+    model = TimeGridSlot
+    extra = 1
+
+class SessionLengthInline(admin.TabularInline):
+    model = SessionLength
+    extra = 1
+
+@admin.register(TimeGrid)
+class TimeGridAdmin(admin.ModelAdmin):
+    list_display = ('Name', 'Days')
+    search_fields = ('Name',)
+    inlines = (TimeGridSlotInline, SessionLengthInline)
+
 @admin.register(CourseName)
 class CourseNameAdmin(admin.ModelAdmin):
     list_display = ('Course', 'CourseCode', 'CourseDescription')
@@ -80,3 +95,23 @@ class TimeTableAdmin(admin.ModelAdmin):
             'fields': ('Venue',)
         }),
     )
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('Programme', 'Status', 'Solver', 'WarmStart', 'Requests', 'RegisteredDate', 'FinishedDate')
+    list_filter = ('Status', 'Solver')
+    search_fields = ('Programme__Programme', 'Token')
+    readonly_fields = ('Token', 'DedupeKey', 'Requests', 'Result', 'Error', 'RegisteredDate', 'StartedDate', 'FinishedDate')
+
+@admin.register(TimetableRevision)
+class TimetableRevisionAdmin(admin.ModelAdmin):
+    list_display = ('Programme', 'Number', 'IsCurrent', 'Solver', 'Fitness', 'RegisteredDate')
+    list_filter = ('IsCurrent', 'Solver', 'Programme')
+    search_fields = ('Programme__Programme',)
+    readonly_fields = ('Programme', 'Number', 'IsCurrent', 'Solver', 'Fitness', 'RegisteredDate')
+    actions = ('make_revision_current',)
+
+    def make_revision_current(self, request, queryset):
+        for revision in queryset.select_related('Programme'):
+            make_current(revision)
+    make_revision_current.short_description = 'Make the selected revisions current'
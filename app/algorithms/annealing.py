@@ -0,0 +1,56 @@
+import math
+import time
+
+from .base import TrajectorySolver, Budget, Solution
+
+
+class SimulatedAnnealingSolver(TrajectorySolver):
+    # Single-trajectory search: a random move is always kept when it does not
+    # add conflicts and kept with probability exp(-delta / T) otherwise. The
+    # temperature cools geometrically over the iteration or time budget,
+    # whichever runs out first.
+    name = 'annealing'
+
+    def __init__(self, start_temperature=2.0, end_temperature=0.05, seed=None, progress=None):
+        super().__init__(seed, progress)
+        self.start_temperature = start_temperature
+        self.end_temperature = end_temperature
+
+    def solve(self, problem, budget: Budget, initial=None) -> Solution:
+        started = time.monotonic()
+        max_iterations = budget.max_iterations or self.default_iterations
+        target_fitness = budget.target_fitness
+        engine, current = self.start(problem, initial)
+        index = current.index
+        best = current.copy()
+        cooling = self.end_temperature / self.start_temperature
+
+        stop_reason = 'iterations'
+        iteration = 0
+        for iteration in range(max_iterations):
+            if target_fitness is not None and best.fitness >= target_fitness:
+                stop_reason = 'target'
+                break
+            progress = iteration / max_iterations
+            if budget.time_limit is not None:
+                elapsed = time.monotonic() - started
+                if elapsed >= budget.time_limit:
+                    stop_reason = 'deadline'
+                    break
+                progress = max(progress, elapsed / budget.time_limit)
+            temperature = self.start_temperature * cooling ** progress
+            self.report('running', iteration, best, started)
+
+            position, row, value = self.random_move(current, problem)
+            previous = int(current.data[row, position])
+            conflicts = index.conflicts
+            current.set_gene(position, row, value)
+            delta = index.conflicts - conflicts
+            if delta > 0 and self.rng.random() >= math.exp(-delta / temperature):
+                current.set_gene(position, row, previous)
+            elif current.fitness > best.fitness:
+                best = current.copy()
+        else:
+            iteration = max_iterations
+
+        return self.finish(best, problem, iteration, started, stop_reason)
@@ -0,0 +1,263 @@
+from .encoding import COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION
+
+
+def lowest_bit(mask) -> int:
+    # Index of the lowest set bit, -1 for an empty mask
+    return (mask & -mask).bit_length() - 1
+
+
+def first_set(mask, start=0) -> int:
+    # Lowest set bit at or above start, wrapping around to the bottom
+    above = mask >> start << start
+    return lowest_bit(above or mask)
+
+
+def random_set(mask, draw) -> int:
+    # A set bit picked uniformly; draw is any non-negative random integer, so
+    # callers can draw them in bulk. Scanning from a random start instead
+    # would favour bits that follow a long run of clear ones.
+    if not mask:
+        return -1
+    for _ in range(draw % mask.bit_count()):
+        mask &= mask - 1
+    return lowest_bit(mask)
+
+
+class AvailabilityIndex:
+    # One integer bitmask per resource over its positions (cells of the
+    # day x slot grid, or resources of one cell). A set bit means taken:
+    # either occupied or inside an unavailability window. Windows live in a
+    # separate mask so clearing an occupancy never frees a blocked cell.
+    # Bits record "at least one", so removing one of two clashing genes
+    # frees the cell early; fitness stays exact, sampling is only a guide.
+    def __init__(self, n_resources, width, blocked=None):
+        self.width = width
+        self.full = (1 << width) - 1
+        self.blocked = list(blocked) if blocked is not None else [0] * n_resources
+        self.occupied = [0] * n_resources
+
+    def copy(self):
+        index = AvailabilityIndex.__new__(AvailabilityIndex)
+        index.width = self.width
+        index.full = self.full
+        index.blocked = self.blocked
+        index.occupied = self.occupied.copy()
+        return index
+
+    def set(self, resource, position):
+        self.occupied[resource] |= 1 << position
+
+    def clear(self, resource, position):
+        self.occupied[resource] &= ~(1 << position)
+
+    def test(self, resource, position) -> bool:
+        return bool((self.occupied[resource] | self.blocked[resource]) >> position & 1)
+
+    def is_blocked(self, resource, position) -> bool:
+        return bool(self.blocked[resource] >> position & 1)
+
+    def free(self, resource) -> int:
+        return ~(self.occupied[resource] | self.blocked[resource]) & self.full
+
+    def first_free(self, resource, within=-1, start=0) -> int:
+        return first_set(self.free(resource) & within, start)
+
+
+class GridAvailability:
+    # Availability of instructors, venues and courses over the day x slot
+    # grid of one problem, plus the transposed view (per cell, which
+    # instructors and venues are free) so both "free cell for this gene" and
+    # "free resource for this cell" are a couple of bit operations.
+    #
+    # A multi-period session sets a bit for every cell it covers. A block of
+    # length k fits at the cells of free & free >> 1 & ... & free >> k-1,
+    # further limited to starts whose run of consecutive slots is long enough.
+    def __init__(self, problem, reserved_instructors=None, reserved_venues=None):
+        self.n_days = len(problem.days)
+        self.n_slots = n_slots = len(problem.time_slots)
+        self.n_cells = n_cells = self.n_days * n_slots
+        self.n_instructors = len(problem.instructors)
+        self.n_venues = len(problem.venues)
+
+        instructor_blocked = self._blocked(problem.instructor_windows, reserved_instructors, self.n_instructors)
+        venue_blocked = self._blocked(problem.venue_windows, reserved_venues, self.n_venues)
+        self.instructors = AvailabilityIndex(self.n_instructors, n_cells, instructor_blocked)
+        self.venues = AvailabilityIndex(self.n_venues, n_cells, venue_blocked)
+        self.courses = AvailabilityIndex(len(problem.courses), n_cells)
+        self.cell_instructors = AvailabilityIndex(n_cells, self.n_instructors, self._transpose(instructor_blocked))
+        self.cell_venues = AvailabilityIndex(n_cells, self.n_venues, self._transpose(venue_blocked))
+
+        # Whether any window or reservation exists at all
+        self.constrained = any(instructor_blocked) or any(venue_blocked)
+        # Cells of each day and of each slot column
+        self.day_cells = [((1 << n_slots) - 1) << day * n_slots for day in range(self.n_days)]
+        self.slot_cells = [sum(1 << day * n_slots + slot for day in range(self.n_days)) for slot in range(n_slots)]
+
+        # Session lengths, cells each block covers from each slot and, per
+        # session type, the cells a block of it may start at
+        self.periods = problem.session_lengths
+        self.multi_period = max(self.periods) > 1
+        self.spans = [[min(length, n_slots - slot) for slot in range(n_slots)] for length in self.periods]
+        self.valid_starts = [
+            sum(self.slot_cells[slot] for slot, run in enumerate(problem.slot_runs) if run >= length)
+            for length in self.periods
+        ]
+
+    @classmethod
+    def for_problem(cls, problem):
+        # Windows are hard limits; bookings held by other programmes are
+        # treated the same way so new placements steer clear of them
+        return cls(problem, problem.reserved_instructors, problem.reserved_venues)
+
+    @staticmethod
+    def _blocked(windows, reserved, n_resources):
+        blocked = list(windows) if windows is not None else [0] * n_resources
+        if reserved is not None:
+            for resource, row in enumerate(reserved.tolist()):
+                for cell, count in enumerate(row):
+                    if count:
+                        blocked[resource] |= 1 << cell
+        return blocked
+
+    def _transpose(self, blocked):
+        transposed = [0] * self.n_cells
+        for resource, mask in enumerate(blocked):
+            while mask:
+                cell = lowest_bit(mask)
+                transposed[cell] |= 1 << resource
+                mask &= mask - 1
+        return transposed
+
+    def copy(self):
+        availability = GridAvailability.__new__(GridAvailability)
+        availability.__dict__.update(self.__dict__)
+        for name in ('instructors', 'venues', 'courses', 'cell_instructors', 'cell_venues'):
+            setattr(availability, name, getattr(self, name).copy())
+        return availability
+
+    def build(self, data):
+        # A copy of this (empty) availability with every gene of data added
+        availability = self.copy()
+        instructors, venues = availability.instructors.occupied, availability.venues.occupied
+        courses = availability.courses.occupied
+        cell_instructors, cell_venues = availability.cell_instructors.occupied, availability.cell_venues.occupied
+        cells = (data[DAY] * self.n_slots + data[SLOT]).tolist()
+        if self.multi_period:
+            for course, instructor, venue, cell, slot, session in zip(
+                    data[COURSE].tolist(), data[INSTRUCTOR].tolist(), data[VENUE].tolist(),
+                    cells, data[SLOT].tolist(), data[SESSION].tolist()):
+                availability.add(course, instructor, venue, cell, self.spans[session][slot])
+            return availability
+        # Inlined add(): this runs for every mutated chromosome
+        for course, instructor, venue, cell in zip(data[COURSE].tolist(), data[INSTRUCTOR].tolist(),
+                                                   data[VENUE].tolist(), cells):
+            bit = 1 << cell
+            instructors[instructor] |= bit
+            venues[venue] |= bit
+            courses[course] |= bit
+            cell_instructors[cell] |= 1 << instructor
+            cell_venues[cell] |= 1 << venue
+        return availability
+
+    def add(self, course, instructor, venue, cell, span=1):
+        for cell in range(cell, cell + span):
+            self.instructors.set(instructor, cell)
+            self.venues.set(venue, cell)
+            self.courses.set(course, cell)
+            self.cell_instructors.set(cell, instructor)
+            self.cell_venues.set(cell, venue)
+
+    def remove(self, course, instructor, venue, cell, span=1):
+        for cell in range(cell, cell + span):
+            self.instructors.clear(instructor, cell)
+            self.venues.clear(venue, cell)
+            self.courses.clear(course, cell)
+            self.cell_instructors.clear(cell, instructor)
+            self.cell_venues.clear(cell, venue)
+
+    def block_starts(self, cells, session) -> int:
+        # Cells of a mask where a whole block of this session type fits
+        if not self.multi_period:
+            return cells
+        starts = cells & self.valid_starts[session]
+        for step in range(1, self.periods[session]):
+            starts &= cells >> step
+        return starts
+
+    def free_cells(self, course, instructor, venue) -> int:
+        return self.instructors.free(instructor) & self.venues.free(venue) & self.courses.free(course)
+
+    def allowed_cells(self, instructor, venue) -> int:
+        # Cells outside the windows of both resources, occupied or not
+        return ~(self.instructors.blocked[instructor] | self.venues.blocked[venue]) & self.instructors.full
+
+    def sample_resource(self, index, cell, draw, span=1) -> int:
+        # A resource free for every cell of the block, else any one outside
+        # its windows there
+        free, allowed = index.full, index.full
+        for cell in range(cell, cell + span):
+            free &= index.free(cell)
+            allowed &= ~index.blocked[cell]
+        return random_set(free or allowed, draw)
+
+    def sample_instructor(self, cell, draw, span=1) -> int:
+        return self.sample_resource(self.cell_instructors, cell, draw, span)
+
+    def sample_venue(self, cell, draw, span=1) -> int:
+        return self.sample_resource(self.cell_venues, cell, draw, span)
+
+    def sample_value(self, course, instructor, venue, day, slot, session, row, draw) -> int:
+        # A new value for one attribute of a gene (already removed from the
+        # index): free if possible, otherwise at least outside every window.
+        # -1 when the windows rule out everything.
+        n_slots = self.n_slots
+        if row == SLOT or row == DAY:
+            within = self.day_cells[day] if row == SLOT else self.slot_cells[slot]
+            free = self.block_starts(self.free_cells(course, instructor, venue), session) & within
+            allowed = self.block_starts(self.allowed_cells(instructor, venue), session) & within
+            cell = random_set(free or allowed, draw)
+            if cell < 0:
+                return -1
+            return cell % n_slots if row == SLOT else cell // n_slots
+        cell = day * n_slots + slot
+        span = self.spans[session][slot]
+        return self.sample_venue(cell, draw, span) if row == VENUE else self.sample_instructor(cell, draw, span)
+
+    def allowed_values(self, instructor, venue, day, slot, session, row) -> list:
+        # Every value of one gene attribute that no window rules out
+        n_slots = self.n_slots
+        if row == SLOT:
+            mask = self.block_starts(self.allowed_cells(instructor, venue), session) >> day * n_slots
+            return [value for value in range(n_slots) if mask >> value & 1]
+        if row == DAY:
+            mask = self.block_starts(self.allowed_cells(instructor, venue), session)
+            return [value for value in range(self.n_days) if mask >> value * n_slots + slot & 1]
+        index = self.cell_venues if row == VENUE else self.cell_instructors
+        cell = day * n_slots + slot
+        blocked = 0
+        for cell in range(cell, cell + self.spans[session][slot]):
+            blocked |= index.blocked[cell]
+        return [value for value in range(index.width) if not blocked >> value & 1]
+
+    def move(self, chromosome, position, row, value):
+        # set_gene that keeps this index in step with the chromosome
+        data = chromosome.data
+        course, instructor, venue, day, slot, session = data[:, position].tolist()
+        self.remove(course, instructor, venue, day * self.n_slots + slot, self.spans[session][slot])
+        chromosome.set_gene(position, row, value)
+        course, instructor, venue, day, slot, session = data[:, position].tolist()
+        self.add(course, instructor, venue, day * self.n_slots + slot, self.spans[session][slot])
+
+    def resample(self, chromosome, position, row, draw, domain_size) -> int:
+        # Move one attribute of a gene to a sampled value through set_gene,
+        # keeping this index in step; falls back to any value in the domain
+        data = chromosome.data
+        course, instructor, venue, day, slot, session = data[:, position].tolist()
+        self.remove(course, instructor, venue, day * self.n_slots + slot, self.spans[session][slot])
+        value = self.sample_value(course, instructor, venue, day, slot, session, row, draw)
+        if value < 0:
+            value = draw % domain_size
+        chromosome.set_gene(position, row, value)
+        course, instructor, venue, day, slot, session = data[:, position].tolist()
+        self.add(course, instructor, venue, day * self.n_slots + slot, self.spans[session][slot])
+        return value
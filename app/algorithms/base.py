@@ -0,0 +1,90 @@
+import time
+import numpy as np
+
+from .fitness import FitnessEngine
+from .genetic_algorithm import TimetableChromosome
+from .local_search import MOVE_ROWS, domain_size, indexed
+from .seeding import GreedySeeder
+from .progress import ProgressEvent
+
+
+class Budget:
+    # Limits for one solve: wall-clock seconds, iterations (generations for
+    # the GA, moves for single-trajectory engines) and a fitness to stop at
+    def __init__(self, time_limit=None, max_iterations=None, target_fitness=1.0):
+        self.time_limit = time_limit
+        self.max_iterations = max_iterations
+        self.target_fitness = target_fitness
+
+    def deadline(self, started):
+        return started + self.time_limit if self.time_limit is not None else None
+
+
+class Solution:
+    def __init__(self, chromosome, problem, solver, iterations, elapsed, stop_reason, metrics=None):
+        self.chromosome = chromosome
+        self.problem = problem
+        self.solver = solver
+        self.iterations = iterations
+        self.elapsed = elapsed
+        self.stop_reason = stop_reason
+        # RunMetrics of the run when the engine collected them
+        self.metrics = metrics
+        if chromosome.genes is None:
+            chromosome.genes = chromosome.decode(problem)
+
+    @property
+    def fitness(self):
+        return self.chromosome.fitness
+
+    @property
+    def genes(self):
+        return self.chromosome.genes
+
+
+class Solver:
+    # Common interface for every timetable engine
+    name = None
+
+    def solve(self, problem, budget: Budget, initial=None) -> Solution:
+        raise NotImplementedError
+
+
+class TrajectorySolver(Solver):
+    # Shared plumbing for engines that move a single chromosome around using
+    # the same ConflictIndex model as the GA's delta fitness and local search
+    default_iterations = 20000
+    # Iterations between progress events
+    report_every = 200
+
+    def __init__(self, seed=None, progress=None):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.progress = progress
+
+    def start(self, problem, initial=None):
+        engine = FitnessEngine(problem)
+        if initial is None:
+            initial = TimetableChromosome(GreedySeeder(problem, self.rng, engine.min_lectures_per_day,
+                                                       engine.max_lectures_per_day).build())
+        else:
+            initial = TimetableChromosome(initial.data.copy())
+        indexed(initial, engine)
+        return engine, initial
+
+    def random_move(self, chromosome, problem, positions=None):
+        if positions:
+            position = positions[int(self.rng.integers(len(positions)))]
+        else:
+            position = int(self.rng.integers(len(chromosome)))
+        row = MOVE_ROWS[int(self.rng.integers(len(MOVE_ROWS)))]
+        return position, row, int(self.rng.integers(domain_size(problem, row)))
+
+    def report(self, stage, iteration, best, started, stop_reason=None):
+        if self.progress is not None and (stage != 'running' or iteration % self.report_every == 0):
+            self.progress(ProgressEvent(stage, iteration, best.fitness, time.monotonic() - started,
+                                        self.name, stop_reason))
+
+    def finish(self, best, problem, iterations, started, stop_reason):
+        self.report('finished', iterations, best, started, stop_reason)
+        return Solution(best, problem, self.name, iterations, time.monotonic() - started, stop_reason)
@@ -0,0 +1,4 @@
+# Rows of the encoded chromosome matrix. A chromosome is a (GENE_FIELDS, n_genes)
+# int matrix and a population is stacked as (population, GENE_FIELDS, n_genes).
+COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION = range(6)
+GENE_FIELDS = 6
@@ -0,0 +1,312 @@
+import numpy as np
+from collections import OrderedDict
+
+from .encoding import COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION
+
+# Lectures per day outside this range count as conflicts. A session of
+# several periods counts once per period.
+MIN_LECTURES_PER_DAY = 6
+MAX_LECTURES_PER_DAY = 7
+
+
+class FitnessEngine:
+    # Counts clashes by bucketing genes on (day, slot, resource) occupancy keys.
+    # A bucket holding c genes contributes c*(c-1)/2 conflicts, which is exactly
+    # what comparing every pair of genes in that bucket would count.
+    #
+    # A multi-period session occupies one key per covered cell, so blocks
+    # clash wherever they overlap. A block that runs past the end of its run
+    # of consecutive slots (into a break or off the day) is one conflict.
+    def __init__(self, problem, min_lectures_per_day=MIN_LECTURES_PER_DAY,
+                 max_lectures_per_day=MAX_LECTURES_PER_DAY):
+        self.n_days = len(problem.days)
+        self.n_slots = len(problem.time_slots)
+        # A day cannot hold more sessions than the grid has periods, so the
+        # minimum is capped there; otherwise short grids never reach fitness 1
+        self.min_lectures_per_day = min(min_lectures_per_day, self.n_slots)
+        self.max_lectures_per_day = max_lectures_per_day
+
+        n_cells = self.n_days * self.n_slots
+        # Periods per session type; with single periods only, the simpler
+        # one-key-per-gene paths below are used
+        self.periods = tuple(problem.session_lengths)
+        self.lengths = np.array(self.periods, dtype=np.int64)
+        self.max_length = max(self.periods)
+        self.multi_period = self.max_length > 1
+        # (session, slot) -> block does not fit in the run starting there
+        self.invalid = np.array([[run < length for run in problem.slot_runs] for length in self.periods])
+        self.invalid_starts = self.invalid.tolist()
+        # Cells a block actually covers, clipped to the end of the day
+        self.spans = [[min(length, self.n_slots - slot) for slot in range(self.n_slots)] for length in self.periods]
+
+        # Each resource (instructor, venue, course) gets its own contiguous
+        # range of occupancy keys
+        self.sizes = np.array([
+            max(len(problem.instructors), 1),
+            max(len(problem.venues), 1),
+            max(len(problem.courses), 1),
+        ], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes * n_cells)[:-1]))
+        self.n_keys = int((self.sizes * n_cells).sum())
+        # Plain int copies for the scalar key arithmetic in ConflictIndex
+        self.key_layout = tuple(zip(self.offsets.tolist(), self.sizes.tolist()))
+        # Bookings other programmes hold on shared instructors and venues,
+        # plus one per cell inside an unavailability window
+        self.reserved_instructors = self._blocking_grid(problem.reserved_instructors, problem.instructor_windows, n_cells)
+        self.reserved_venues = self._blocking_grid(problem.reserved_venues, problem.venue_windows, n_cells)
+
+    @staticmethod
+    def _blocking_grid(reserved, windows, n_cells):
+        if windows is None:
+            return reserved
+        grid = np.array([[mask >> cell & 1 for cell in range(n_cells)] for mask in windows], dtype=np.int32)
+        return grid + reserved if reserved is not None else grid
+
+    def block_cells(self, days, slots, sessions):
+        # (max_length, *shape) cells covered by blocks starting at the given
+        # day/slot arrays, and a mask of which of them are real. Masked-out
+        # entries repeat the first cell so they stay valid indices.
+        steps = np.arange(self.max_length).reshape((-1,) + (1,) * np.ndim(slots))
+        covered = (steps < self.lengths[sessions]) & (slots + steps < self.n_slots)
+        first = days.astype(np.int64) * self.n_slots + slots
+        return np.where(covered, first + steps, first), covered
+
+    def occupancy_keys(self, chromosome):
+        rows = chromosome.data[[INSTRUCTOR, VENUE, COURSE]]
+        if self.multi_period:
+            cells, covered = self.block_cells(chromosome.day, chromosome.slot, chromosome.session_type)
+            keys = self.offsets[:, None, None] + cells[None] * self.sizes[:, None, None] + rows[:, None, :]
+            return keys[:, covered].ravel()
+        cells = chromosome.day.astype(np.int64) * self.n_slots + chromosome.slot
+        return (self.offsets[:, None] + cells[None, :] * self.sizes[:, None] + rows).ravel()
+
+    def clash_count(self, chromosome) -> int:
+        counts = np.bincount(self.occupancy_keys(chromosome), minlength=self.n_keys)
+        clashes = int((counts * (counts - 1) // 2).sum())
+        if self.multi_period:
+            cells, covered = self.block_cells(chromosome.day, chromosome.slot, chromosome.session_type)
+            reserved = self.reserved_clashes(chromosome.instructor, chromosome.venue, cells) * covered
+            invalid = self.invalid[chromosome.session_type, chromosome.slot]
+            return clashes + int(reserved.sum()) + int(invalid.sum())
+        cells = chromosome.day.astype(np.int64) * self.n_slots + chromosome.slot
+        return clashes + int(self.reserved_clashes(chromosome.instructor, chromosome.venue, cells).sum())
+
+    def reserved_clashes(self, instructors, venues, cells):
+        # Works elementwise on scalars, gene rows or whole population matrices
+        clashes = 0
+        if self.reserved_instructors is not None:
+            clashes = clashes + self.reserved_instructors[instructors, cells]
+        if self.reserved_venues is not None:
+            clashes = clashes + self.reserved_venues[venues, cells]
+        return np.asarray(clashes)
+
+    def day_penalty(self, lectures_per_day) -> int:
+        shortfall = np.clip(self.min_lectures_per_day - lectures_per_day, 0, None)
+        excess = np.clip(lectures_per_day - self.max_lectures_per_day, 0, None)
+        return int(shortfall.sum() + excess.sum())
+
+    def lectures_per_day(self, chromosome):
+        if self.multi_period:
+            return np.bincount(chromosome.day, weights=self.lengths[chromosome.session_type],
+                               minlength=self.n_days).astype(np.int64)
+        return np.bincount(chromosome.day, minlength=self.n_days)
+
+    def count_conflicts(self, chromosome) -> int:
+        lectures_per_day = self.lectures_per_day(chromosome)
+        return self.clash_count(chromosome) + self.day_penalty(lectures_per_day)
+
+    def fitness(self, chromosome) -> float:
+        return 1 / (self.count_conflicts(chromosome) + 1)
+
+    def evaluate_matrix(self, matrix):
+        # Score a whole (population, GENE_FIELDS, n_genes) matrix at once.
+        size = matrix.shape[0]
+        rows = np.arange(size, dtype=np.int64)[:, None]
+        if self.multi_period:
+            clashes = self._block_clashes(matrix, rows)
+        else:
+            cells = matrix[:, DAY].astype(np.int64) * self.n_slots + matrix[:, SLOT]
+            keys = (self.offsets[None, :, None]
+                    + cells[:, None, :] * self.sizes[None, :, None]
+                    + matrix[:, [INSTRUCTOR, VENUE, COURSE]])
+            # Offset each individual into its own key range, then count occupied keys only
+            keys = (keys.reshape(size, -1) + rows * self.n_keys).ravel()
+            clashes = self._clashes_per_individual(keys, size)
+            if self.reserved_instructors is not None or self.reserved_venues is not None:
+                reserved = self.reserved_clashes(matrix[:, INSTRUCTOR], matrix[:, VENUE], cells)
+                clashes = clashes + reserved.sum(axis=1)
+
+        day_keys = (matrix[:, DAY] + rows * self.n_days).ravel()
+        weights = self.lengths[matrix[:, SESSION]].ravel() if self.multi_period else None
+        lectures_per_day = np.bincount(day_keys, weights=weights,
+                                       minlength=size * self.n_days).reshape(size, self.n_days)
+        shortfall = np.clip(self.min_lectures_per_day - lectures_per_day, 0, None)
+        excess = np.clip(lectures_per_day - self.max_lectures_per_day, 0, None)
+
+        conflicts = clashes + shortfall.sum(axis=1) + excess.sum(axis=1)
+        return 1 / (conflicts + 1)
+
+    def _clashes_per_individual(self, keys, size):
+        occupied, counts = np.unique(keys, return_counts=True)
+        return np.bincount(occupied // self.n_keys, weights=counts * (counts - 1) // 2, minlength=size)
+
+    def _block_clashes(self, matrix, rows):
+        # evaluate_matrix for multi-period sessions: one key per covered cell
+        size = matrix.shape[0]
+        instructors, venues = matrix[:, INSTRUCTOR], matrix[:, VENUE]
+        cells, covered = self.block_cells(matrix[:, DAY], matrix[:, SLOT], matrix[:, SESSION])
+        resources = matrix[:, [INSTRUCTOR, VENUE, COURSE]].transpose(1, 0, 2)[:, None]
+        keys = (self.offsets[:, None, None, None] + cells[None] * self.sizes[:, None, None, None]
+                + resources + rows * self.n_keys)
+        clashes = self._clashes_per_individual(keys[:, covered].ravel(), size)
+        if self.reserved_instructors is not None or self.reserved_venues is not None:
+            reserved = self.reserved_clashes(instructors, venues, cells) * covered
+            clashes = clashes + reserved.sum(axis=(0, 2))
+        return clashes + self.invalid[matrix[:, SESSION], matrix[:, SLOT]].sum(axis=1)
+
+
+class ConflictIndex:
+    # Occupancy counters for one chromosome: how many genes hold each
+    # (day, slot, resource) key, plus lectures per day. Adding or removing a
+    # gene adjusts the running clash count in O(1) (O(periods) for a long
+    # session), so mutation and crossover can keep fitness current without
+    # rescoring the whole chromosome. Genes are passed as all six fields.
+    def __init__(self, engine):
+        self.engine = engine
+        self.occupancy = {}
+        self.lectures_per_day = [0] * engine.n_days
+        self.clashes = 0
+        self.external = engine.reserved_instructors is not None or engine.reserved_venues is not None
+
+    @classmethod
+    def build(cls, engine, chromosome):
+        index = cls(engine)
+        for gene in chromosome.data.T.tolist():
+            index.add(*gene)
+        return index
+
+    def copy(self):
+        index = ConflictIndex.__new__(ConflictIndex)
+        index.engine = self.engine
+        index.occupancy = self.occupancy.copy()
+        index.lectures_per_day = self.lectures_per_day.copy()
+        index.clashes = self.clashes
+        index.external = self.external
+        return index
+
+    def _keys(self, course, instructor, venue, day, slot, session):
+        engine = self.engine
+        cell = day * engine.n_slots + slot
+        (i_offset, i_size), (v_offset, v_size), (c_offset, c_size) = engine.key_layout
+        if engine.multi_period:
+            return [key for cell in range(cell, cell + engine.spans[session][slot])
+                    for key in (i_offset + cell * i_size + instructor,
+                                v_offset + cell * v_size + venue,
+                                c_offset + cell * c_size + course)]
+        return (i_offset + cell * i_size + instructor,
+                v_offset + cell * v_size + venue,
+                c_offset + cell * c_size + course)
+
+    def _fixed(self, instructor, venue, day, slot, session) -> int:
+        # Clashes with reservations and windows, plus a misplaced block
+        engine = self.engine
+        cell = day * engine.n_slots + slot
+        if not engine.multi_period:
+            return int(engine.reserved_clashes(instructor, venue, cell))
+        clashes = int(engine.invalid_starts[session][slot])
+        if self.external:
+            cells = range(cell, cell + engine.spans[session][slot])
+            clashes += sum(int(engine.reserved_clashes(instructor, venue, cell)) for cell in cells)
+        return clashes
+
+    def add(self, course, instructor, venue, day, slot, session):
+        occupancy = self.occupancy
+        for key in self._keys(course, instructor, venue, day, slot, session):
+            count = occupancy.get(key, 0)
+            # Joining a bucket of c genes creates c new clashing pairs
+            self.clashes += count
+            occupancy[key] = count + 1
+        if self.external or self.engine.multi_period:
+            self.clashes += self._fixed(instructor, venue, day, slot, session)
+        self.lectures_per_day[day] += self.engine.periods[session]
+
+    def remove(self, course, instructor, venue, day, slot, session):
+        occupancy = self.occupancy
+        for key in self._keys(course, instructor, venue, day, slot, session):
+            count = occupancy[key] - 1
+            self.clashes -= count
+            if count:
+                occupancy[key] = count
+            else:
+                del occupancy[key]
+        if self.external or self.engine.multi_period:
+            self.clashes -= self._fixed(instructor, venue, day, slot, session)
+        self.lectures_per_day[day] -= self.engine.periods[session]
+
+    def gene_clashes(self, course, instructor, venue, day, slot, session) -> int:
+        # Clashing pairs this (already added) gene takes part in
+        occupancy = self.occupancy
+        clashes = sum(occupancy[key] - 1 for key in self._keys(course, instructor, venue, day, slot, session))
+        if self.external or self.engine.multi_period:
+            clashes += self._fixed(instructor, venue, day, slot, session)
+        return clashes
+
+    def day_penalty(self) -> int:
+        engine = self.engine
+        penalty = 0
+        for count in self.lectures_per_day:
+            if count < engine.min_lectures_per_day:
+                penalty += engine.min_lectures_per_day - count
+            elif count > engine.max_lectures_per_day:
+                penalty += count - engine.max_lectures_per_day
+        return penalty
+
+    @property
+    def conflicts(self) -> int:
+        return self.clashes + self.day_penalty()
+
+    @property
+    def fitness(self) -> float:
+        return 1 / (self.conflicts + 1)
+
+
+class FitnessCache:
+    # Bounded LRU of fitness scores keyed by a fingerprint of the encoded
+    # chromosome, so repeated individuals are not rescored
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(chromosome) -> int:
+        return hash(chromosome.data.tobytes())
+
+    def get(self, key):
+        score = self.scores.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.scores.move_to_end(key)
+        return score
+
+    def put(self, key, score):
+        self.scores[key] = score
+        self.scores.move_to_end(key)
+        if len(self.scores) > self.maxsize:
+            self.scores.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.scores.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.scores)
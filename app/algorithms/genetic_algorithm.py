@@ -1,7 +1,22 @@
+import logging
 import random
+import time
+import numpy as np
 from typing import List, Dict, Set
-from ..models import TimeTable, TimeTableMain, Instructor, Venue, CourseName
 from datetime import datetime, timedelta
+from .encoding import COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION, GENE_FIELDS
+from .fitness import FitnessEngine, ConflictIndex, FitnessCache, MIN_LECTURES_PER_DAY, MAX_LECTURES_PER_DAY
+from .problem import ProblemInstance
+from .seeding import GreedySeeder
+from .availability import GridAvailability
+from .local_search import MOVE_ROWS, LOCAL_SEARCHES, domain_size
+from .metrics import RunMetrics, NULL_METRICS
+from .progress import ProgressEvent
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the random integers handed to GridAvailability sampling
+RANDOM_DRAW = 1 << 30
 
 class TimetableGene:
     def __init__(self, course, instructor, venue, time_start, time_end, day, session_type):
@@ -14,214 +29,666 @@ class TimetableGene:
         self.session_type = session_type
 
 class TimetableChromosome:
-    def __init__(self, genes):
-        self.genes = genes
-        self.fitness = 0
-        self.lectures_per_day = self._count_lectures_per_day()
+    def __init__(self, data, index=None):
+        # data is a (GENE_FIELDS, n_genes) int matrix, one column per session
+        self.data = data
+        # Optional ConflictIndex that keeps fitness current as genes change
+        self.index = index
+        self.fitness = index.fitness if index is not None else None
+        self.genes = None
+
+    def lectures_per_day(self, problem):
+        # Periods taught per day, a session counting once per period as in
+        # the FitnessEngine; the index keeps the same counts current
+        if self.index is not None:
+            return np.array(self.index.lectures_per_day)
+        lengths = np.array(problem.session_lengths, dtype=np.int64)
+        return np.bincount(self.day, weights=lengths[self.session_type], minlength=len(problem.days)).astype(np.int64)
+
+    @property
+    def course(self):
+        return self.data[COURSE]
+
+    @property
+    def instructor(self):
+        return self.data[INSTRUCTOR]
+
+    @property
+    def venue(self):
+        return self.data[VENUE]
+
+    @property
+    def day(self):
+        return self.data[DAY]
+
+    @property
+    def slot(self):
+        return self.data[SLOT]
+
+    @property
+    def session_type(self):
+        return self.data[SESSION]
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def copy(self):
+        chromosome = TimetableChromosome(self.data.copy(), self.index.copy() if self.index is not None else None)
+        chromosome.fitness = self.fitness
+        return chromosome
+
+    def assign(self, other):
+        # Take over another chromosome's genes and state without replacing
+        # this one's storage
+        self.data[...] = other.data
+        self.index = other.index.copy() if other.index is not None else None
+        self.fitness = other.fitness
+        self.genes = None
+
+    def set_gene(self, position, row, value):
+        index = self.index
+        if index is not None:
+            index.remove(*self.data[:, position].tolist())
+        self.data[row, position] = value
+        if index is not None:
+            index.add(*self.data[:, position].tolist())
+            self.fitness = index.fitness
+        else:
+            self.fitness = None
+
+    def decode(self, problem: ProblemInstance) -> List[TimetableGene]:
+        # Resolve indices back to model instances and 'HH:MM' strings
+        genes = []
+        for course, instructor, venue, day, slot, session in self.data.T.tolist():
+            # A multi-period session ends with the last slot it covers
+            last = min(slot + problem.session_lengths[session], len(problem.time_slots)) - 1
+            time_start, time_end = problem.time_slots[slot][0], problem.time_slots[last][1]
+            genes.append(TimetableGene(
+                course=problem.courses[course],
+                instructor=problem.instructors[instructor],
+                venue=problem.venues[venue],
+                time_start=time_start,
+                time_end=time_end,
+                day=problem.days[day],
+                session_type=problem.session_types[session]
+            ))
+        return genes
+
+class PopulationBuffers:
+    # Two preallocated (size, GENE_FIELDS, n_genes) gene matrices with one
+    # TimetableChromosome view per row. The current generation lives in the
+    # front buffer while the next one is written into the back buffer in
+    # place; then they swap. Population storage is allocated once per run
+    # instead of once per child.
+    def __init__(self, size, n_genes):
+        self.matrices = (np.empty((size, GENE_FIELDS, n_genes), dtype=np.int32),
+                         np.empty((size, GENE_FIELDS, n_genes), dtype=np.int32))
+        self.members = tuple([TimetableChromosome(matrix[row]) for row in range(size)] for matrix in self.matrices)
+        # Gathered parents for batched crossover
+        self.scratch = (np.empty(((size + 1) // 2, GENE_FIELDS, n_genes), dtype=np.int32),
+                        np.empty(((size + 1) // 2, GENE_FIELDS, n_genes), dtype=np.int32))
+        self.front = 0
+        self.current = []
+
+    @classmethod
+    def holding(cls, population, size):
+        buffers = cls(size, population[0].data.shape[1])
+        buffers.load(population)
+        return buffers
+
+    def load(self, population):
+        members = self.members[self.front][:len(population)]
+        for member, chromosome in zip(members, population):
+            member.assign(chromosome)
+        self.current = members
+
+    @property
+    def matrix(self):
+        return self.matrices[self.front]
+
+    @property
+    def back(self):
+        return self.members[1 - self.front]
+
+    @property
+    def back_matrix(self):
+        return self.matrices[1 - self.front]
+
+    def swap(self):
+        self.front = 1 - self.front
+        self.current = self.members[self.front]
 
-    def _count_lectures_per_day(self):
-        day_counts = {'Monday': 0, 'Tuesday': 0, 'Wednesday': 0, 'Thursday': 0, 'Friday': 0}
-        for gene in self.genes:
-            day_counts[gene.day] += 1
-        return day_counts
 
 class GeneticTimetableAlgorithm:
-    def __init__(self, 
-                 population_size=50, 
-                 mutation_rate=0.1, 
+    def __init__(self,
+                 population_size=50,
+                 mutation_rate=0.1,
                  elite_size=2,
-                 generations=100):
+                 generations=100,
+                 incremental=False,
+                 time_limit=None,
+                 target_fitness=None,
+                 stall_generations=None,
+                 fitness_cache_size=4096,
+                 greedy_seed_ratio=0.0,
+                 local_search=None,
+                 local_search_on='offspring',
+                 seed=None,
+                 metrics=False,
+                 progress=None,
+                 double_buffer=True,
+                 crossover_mode='day'):
         self.population_size = population_size
         self.mutation_rate = mutation_rate
         self.elite_size = elite_size
         self.generations = generations
-        self.days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        # Continuous time slots from 10:00 to 17:00 with lunch break
-        self.time_slots = [
-            ('10:00', '11:00'),
-            ('11:00', '12:00'),
-            ('12:00', '13:00'),
-            # Lunch break 13:00-14:00
-            ('14:00', '15:00'),
-            ('15:00', '16:00'),
-            ('16:00', '17:00'),
-        ]
-        self.min_lectures_per_day = 6
-        self.max_lectures_per_day = 7
-
-    def initialize_population(self, programme, semester, year_of_study) -> List[TimetableChromosome]:
+        # Track per-chromosome occupancy so mutation and crossover update
+        # fitness in place instead of rescoring every generation
+        self.incremental = incremental
+        # Stopping criteria on top of the generation count: a wall-clock
+        # budget in seconds, a fitness to stop at (1.0 means conflict free)
+        # and a number of generations without improvement
+        self.time_limit = time_limit
+        self.target_fitness = target_fitness
+        self.stall_generations = stall_generations
+        # LRU of scores for individuals seen before; 0 disables it
+        self.fitness_cache = FitnessCache(fitness_cache_size) if fitness_cache_size else None
+        # Share of the initial population built by the greedy constructor;
+        # the rest stays random for diversity
+        self.greedy_seed_ratio = greedy_seed_ratio
+        # Optional memetic repair step, a LocalSearch or a name from
+        # LOCAL_SEARCHES, applied after mutation to the 'offspring' or in
+        # place to the 'elite'
+        if local_search_on not in ('offspring', 'elite'):
+            raise ValueError("local_search_on must be 'offspring' or 'elite'")
+        if isinstance(local_search, str) and local_search not in LOCAL_SEARCHES:
+            raise ValueError(f"Unknown local search: {local_search}")
+        self.local_search = local_search
+        self.local_search_on = local_search_on
+        self.min_lectures_per_day = MIN_LECTURES_PER_DAY
+        self.max_lectures_per_day = MAX_LECTURES_PER_DAY
+        self.fitness_engine = None
+        # Bitmask availability of instructors and venues (windows and
+        # reservations) for the current problem, copied per chromosome
+        self.availability = None
+        # Both random streams derive from seed, so a seeded run bounded by
+        # generations rather than time_limit is reproducible
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.random = random.Random(seed)
+        # A search named here draws from the same seeded stream
+        if isinstance(self.local_search, str):
+            self.local_search = LOCAL_SEARCHES[self.local_search](rng=self.rng)
+        self.tournament_size = 3
+        # Per-phase timings and counters for each run (a RunMetrics); when
+        # off, a shared no-op object keeps the hooks essentially free
+        self.collect_metrics = metrics
+        self.metrics = NULL_METRICS
+        # Optional callable receiving a ProgressEvent per generation; wrap it
+        # in a ProgressThrottle to limit the rate
+        self.progress = progress
+        # 'day' swaps whole days between parents, 'point' cuts at any gene
+        if crossover_mode not in ('day', 'point'):
+            raise ValueError("crossover_mode must be 'day' or 'point'")
+        self.crossover_mode = crossover_mode
+        # Write each generation into preallocated PopulationBuffers instead
+        # of allocating new chromosomes
+        self.double_buffer = double_buffer
+        self.buffers = None
+        # Best-so-far state, readable at any moment while run() is going
+        self.problem = None
+        self.best = None
+        self.generations_run = 0
+        self.stop_reason = None
+        self._stop_requested = False
+
+    def prepare(self, problem: ProblemInstance):
+        self.fitness_engine = FitnessEngine(problem, self.min_lectures_per_day, self.max_lectures_per_day)
+        self.availability = GridAvailability.for_problem(problem)
+        # Scores are keyed by the encoded genes alone, so they only hold for
+        # the problem (and reservations) they were computed against
+        if self.fitness_cache is not None:
+            self.fitness_cache.clear()
+
+    def initialize_population(self, problem: ProblemInstance) -> List[TimetableChromosome]:
         population = []
-        
-        try:
-            timetable_main = TimeTableMain.objects.get(
-                Programme=programme,
-                Semister=semester,
-                YearOfStudy=year_of_study
-            )
-            
-            department = timetable_main.Department
-            dept_prefix = department.DepartmentName.split()[0][:2].upper()
-            
-            courses = CourseName.objects.filter(CourseCode__startswith=dept_prefix)
-            if not courses.exists():
-                courses = CourseName.objects.all()
-            
-            instructors = Instructor.objects.filter(Department=department)
-            if not instructors.exists():
-                instructors = Instructor.objects.all()
-            
-            venues = Venue.objects.all()
-            
-            print(f"Found {courses.count()} courses, {instructors.count()} instructors, {venues.count()} venues")
-
-            for _ in range(self.population_size):
-                genes = []
-                # Create balanced schedule for each day
-                for day in self.days:
-                    day_slots = self.time_slots.copy()
-                    num_lectures = random.randint(self.min_lectures_per_day, self.max_lectures_per_day)
-                    
-                    for _ in range(num_lectures):
-                        if not day_slots:  # No more available time slots
-                            break
-                            
-                        course = random.choice(courses)
-                        instructor = random.choice(instructors)
-                        venue = random.choice(venues)
-                        time_slot = random.choice(day_slots)
-                        day_slots.remove(time_slot)  # Remove used time slot
-                        
-                        gene = TimetableGene(
-                            course=course,
-                            instructor=instructor,
-                            venue=venue,
-                            time_start=time_slot[0],
-                            time_end=time_slot[1],
-                            day=day,
-                            session_type=random.choice(['Lecture', 'Tutorial', 'Lab'])
-                        )
-                        genes.append(gene)
-                
-                chromosome = TimetableChromosome(genes)
-                population.append(chromosome)
-            
-            return population
-            
-        except Exception as e:
-            print(f"Error in initialize_population: {str(e)}")
-            raise
+        self.prepare(problem)
+
+        logger.debug("Found %d courses, %d instructors, %d venues",
+                     len(problem.courses), len(problem.instructors), len(problem.venues))
+
+        n_greedy = int(round(self.population_size * self.greedy_seed_ratio))
+        engine = self.fitness_engine
+        seeder = GreedySeeder(problem, self.rng, engine.min_lectures_per_day, engine.max_lectures_per_day,
+                              self.availability)
+        for member in range(self.population_size):
+            if member < n_greedy:
+                chromosome = TimetableChromosome(seeder.build())
+            else:
+                chromosome = self._random_chromosome(problem)
+            if self.incremental:
+                chromosome.index = ConflictIndex.build(self.fitness_engine, chromosome)
+                chromosome.fitness = chromosome.index.fitness
+            population.append(chromosome)
+
+        return population
+
+    def _random_chromosome(self, problem: ProblemInstance) -> TimetableChromosome:
+        if problem.max_session_length > 1:
+            return self._random_block_chromosome(problem)
+        n_slots = len(problem.time_slots)
+        columns = []
+        # Create balanced schedule for each day, one session per distinct time
+        # slot. Every day and every chromosome of the problem gets the same
+        # number of sessions, so crossover and batched scoring see one gene
+        # count; the engine caps the minimum at the grid's periods
+        num_lectures = self.fitness_engine.min_lectures_per_day
+        for day in range(len(problem.days)):
+            block = np.empty((GENE_FIELDS, num_lectures), dtype=np.int32)
+            block[COURSE] = self.rng.integers(len(problem.courses), size=num_lectures)
+            block[INSTRUCTOR] = self.rng.integers(len(problem.instructors), size=num_lectures)
+            block[VENUE] = self.rng.integers(len(problem.venues), size=num_lectures)
+            block[DAY] = day
+            block[SLOT] = self.rng.permutation(n_slots)[:num_lectures]
+            block[SESSION] = self.rng.integers(len(problem.session_types), size=num_lectures)
+            columns.append(block)
+        data = np.concatenate(columns, axis=1)
+        if self.availability.constrained:
+            self._place_resources(data)
+        return TimetableChromosome(data)
+
+    def _random_block_chromosome(self, problem: ProblemInstance) -> TimetableChromosome:
+        # Sessions of several periods: the problem's session plan fixes which
+        # session types run on which day; each is put at a random start where
+        # its whole block fits and is still unused that day, falling back to
+        # its slot in the plan
+        n_slots = len(problem.time_slots)
+        lengths = problem.session_lengths
+        plan = problem.session_plan(self.fitness_engine.min_lectures_per_day)
+        data = np.empty((GENE_FIELDS, len(plan)), dtype=np.int32)
+        used = [0] * len(problem.days)
+        for position in self.rng.permutation(len(plan)).tolist():
+            day, slot, session = plan[position]
+            block = (1 << lengths[session]) - 1
+            starts = [start for start in range(n_slots)
+                      if problem.slot_runs[start] >= lengths[session] and not used[day] & block << start]
+            if starts:
+                slot = starts[int(self.rng.integers(len(starts)))]
+            used[day] |= block << slot
+            data[DAY, position] = day
+            data[SLOT, position] = slot
+            data[SESSION, position] = session
+        n_genes = len(plan)
+        data[COURSE] = self.rng.integers(len(problem.courses), size=n_genes)
+        data[INSTRUCTOR] = self.rng.integers(len(problem.instructors), size=n_genes)
+        data[VENUE] = self.rng.integers(len(problem.venues), size=n_genes)
+        if self.availability.constrained:
+            self._place_resources(data)
+        return TimetableChromosome(data)
+
+    def _place_resources(self, data):
+        # Windows or reservations exist: draw each session's instructor and
+        # venue from those free in its cell (every cell of its block) instead
+        # of uniformly
+        availability = self.availability.copy()
+        n_slots = availability.n_slots
+        draws = self.rng.integers(RANDOM_DRAW, size=(data.shape[1], 2)).tolist()
+        for position, (course, day, slot, session) in enumerate(data[[COURSE, DAY, SLOT, SESSION]].T.tolist()):
+            cell = day * n_slots + slot
+            span = availability.spans[session][slot]
+            instructor = availability.sample_instructor(cell, draws[position][0], span)
+            venue = availability.sample_venue(cell, draws[position][1], span)
+            if instructor >= 0:
+                data[INSTRUCTOR, position] = instructor
+            if venue >= 0:
+                data[VENUE, position] = venue
+            availability.add(course, int(data[INSTRUCTOR, position]), int(data[VENUE, position]), cell, span)
 
     def calculate_fitness(self, chromosome: TimetableChromosome) -> float:
-        conflicts = 0
-        
-        # Check basic constraints (same as before)
-        for i, gene1 in enumerate(chromosome.genes):
-            for j, gene2 in enumerate(chromosome.genes[i+1:]):
-                if gene1.day == gene2.day:
-                    # Same instructor at same time
-                    if (gene1.instructor == gene2.instructor and 
-                        gene1.time_start == gene2.time_start):
-                        conflicts += 1
-                    
-                    # Same venue at same time
-                    if (gene1.venue == gene2.venue and 
-                        gene1.time_start == gene2.time_start):
-                        conflicts += 1
-                    
-                    # Same course at same time
-                    if (gene1.course == gene2.course and 
-                        gene1.time_start == gene2.time_start):
-                        conflicts += 1
-
-        # Check lectures per day constraints
-        for day, count in chromosome.lectures_per_day.items():
-            if count < self.min_lectures_per_day:
-                conflicts += (self.min_lectures_per_day - count)
-            elif count > self.max_lectures_per_day:
-                conflicts += (count - self.max_lectures_per_day)
+        # Instructor, venue and course clashes plus lectures per day limits
+        conflicts = self.fitness_engine.count_conflicts(chromosome)
 
         # Calculate fitness (inverse of conflicts)
         fitness = 1 / (conflicts + 1)
         chromosome.fitness = fitness
         return fitness
 
+    def evaluate_population(self, population: List[TimetableChromosome]) -> np.ndarray:
+        matrix = np.stack([chromosome.data for chromosome in population])
+        fitness = self.fitness_engine.evaluate_matrix(matrix)
+        for chromosome, score in zip(population, fitness.tolist()):
+            chromosome.fitness = score
+        return fitness
+
+    def _evaluate_unscored(self, population: List[TimetableChromosome]):
+        unscored = [chromosome for chromosome in population if chromosome.fitness is None]
+        if not unscored:
+            return
+        metrics = self.metrics
+        started = metrics.clock()
+        cache = self.fitness_cache
+        if cache is None:
+            self.evaluate_population(unscored)
+            metrics.add('evaluate', started)
+            metrics.evaluated(len(unscored))
+            return
+
+        misses, keys = [], []
+        for chromosome in unscored:
+            key = cache.fingerprint(chromosome)
+            score = cache.get(key)
+            if score is None:
+                misses.append(chromosome)
+                keys.append(key)
+            else:
+                chromosome.fitness = score
+        if misses:
+            for key, score in zip(keys, self.evaluate_population(misses).tolist()):
+                cache.put(key, score)
+        metrics.add('evaluate', started)
+        metrics.evaluated(len(misses), len(unscored) - len(misses))
+
     def select_parents(self, population: List[TimetableChromosome]) -> List[TimetableChromosome]:
-        # Tournament selection
-        tournament_size = 3
-        selected = []
-        
-        for _ in range(len(population)):
-            tournament = random.sample(population, tournament_size)
-            winner = max(tournament, key=lambda x: x.fitness)
-            selected.append(winner)
-        
-        return selected
+        fitness = np.array([chromosome.fitness for chromosome in population])
+        return [population[winner] for winner in self.tournament(fitness).tolist()]
+
+    def tournament(self, fitness: np.ndarray) -> np.ndarray:
+        # Tournament selection over a fitness vector: one tournament per
+        # individual, all drawn at once. Entrants are distinct, drawn with
+        # Floyd's algorithm one column at a time; winners are the argmax.
+        size = len(fitness)
+        entrants = min(self.tournament_size, size)
+        draws = np.empty((size, entrants), dtype=np.int64)
+        for column, bound in enumerate(range(size - entrants + 1, size + 1)):
+            candidate = self.rng.integers(bound, size=size)
+            taken = (draws[:, :column] == candidate[:, None]).any(axis=1)
+            draws[:, column] = np.where(taken, bound - 1, candidate)
+        return draws[np.arange(size), np.argmax(fitness[draws], axis=1)]
+
+    def pair_parents(self, parents: np.ndarray, n_children: int, days: np.ndarray):
+        # Parent pairs and crossover masks for n_children children in one
+        # batch: pair k yields children 2k and 2k + 1 from two distinct
+        # entries of parents. masks[k] marks the genes the first child takes
+        # from the first parent (the second child gets the rest of them).
+        # days holds the DAY row of every member of the population.
+        n_pairs = (n_children + 1) // 2
+        first = self.rng.integers(len(parents), size=n_pairs)
+        second = (first + self.rng.integers(1, len(parents), size=n_pairs)) % len(parents)
+        first, second = parents[first], parents[second]
+        if self.crossover_mode == 'day':
+            masks = self.day_masks(days[first])
+        else:
+            n_genes = days.shape[1]
+            cuts = self.rng.integers(n_genes, size=n_pairs)
+            masks = np.arange(n_genes) < cuts[:, None]
+        return first, second, masks
+
+    def day_masks(self, days):
+        # Day-aligned crossover over the DAY rows of each pair's first
+        # parent: a random set of days (at least one, never all) is picked
+        # per pair and a gene is taken from the first parent exactly when
+        # that parent holds it on a picked day. Every day of the first parent
+        # thus reaches one child whole, however mutation has moved its genes
+        # between positions; multi-period session plans give days unequal
+        # gene counts, so fixed position blocks would cut through them.
+        n_pairs = len(days)
+        n_days = self.fitness_engine.n_days
+        chosen = self.rng.random((n_pairs, n_days)) < 0.5
+        rows = np.arange(n_pairs)
+        if n_days > 1:
+            kept = self.rng.integers(n_days, size=n_pairs)
+            chosen[rows, kept] = True
+            chosen[rows, (kept + self.rng.integers(1, n_days, size=n_pairs)) % n_days] = False
+        return chosen[rows[:, None], days]
 
     def crossover(self, parent1: TimetableChromosome, parent2: TimetableChromosome) -> tuple:
-        if len(parent1.genes) != len(parent2.genes):
+        if len(parent1) != len(parent2):
             raise ValueError("Parents must have same number of genes")
-        
-        crossover_point = random.randint(0, len(parent1.genes)-1)
-        
-        child1_genes = parent1.genes[:crossover_point] + parent2.genes[crossover_point:]
-        child2_genes = parent2.genes[:crossover_point] + parent1.genes[crossover_point:]
-        
-        return (TimetableChromosome(child1_genes), TimetableChromosome(child2_genes))
-
-    def mutate(self, chromosome: TimetableChromosome):
-        for gene in chromosome.genes:
-            if random.random() < self.mutation_rate:
-                # Randomly change one attribute
-                mutation_type = random.choice(['time', 'day', 'venue', 'instructor'])
-                
-                if mutation_type == 'time':
-                    time_slot = random.choice(self.time_slots)
-                    gene.time_start = time_slot[0]
-                    gene.time_end = time_slot[1]
-                elif mutation_type == 'day':
-                    gene.day = random.choice(self.days)
-                elif mutation_type == 'venue':
-                    gene.venue = random.choice(Venue.objects.all())
-                elif mutation_type == 'instructor':
-                    gene.instructor = random.choice(Instructor.objects.all())
-
-    def evolve(self, programme, semester, year_of_study) -> TimetableChromosome:
-        # Initialize population
-        population = self.initialize_population(programme, semester, year_of_study)
-        
-        # Evolution loop
-        for generation in range(self.generations):
-            # Calculate fitness for all chromosomes
-            for chromosome in population:
-                self.calculate_fitness(chromosome)
-            
-            # Sort population by fitness
-            population.sort(key=lambda x: x.fitness, reverse=True)
-            
-            # Keep elite chromosomes
-            new_population = population[:self.elite_size]
-            
-            # Selection
-            parents = self.select_parents(population)
-            
-            # Crossover
-            while len(new_population) < self.population_size:
-                parent1, parent2 = random.sample(parents, 2)
-                child1, child2 = self.crossover(parent1, parent2)
-                new_population.extend([child1, child2])
-            
+
+        crossover_point = self.random.randint(0, len(parent1)-1)
+        return self._crossover_masked(parent1, parent2, np.arange(len(parent1)) < crossover_point)
+
+    def _crossover_masked(self, parent1, parent2, mask):
+        # np.where copies, so children never alias parent storage
+        child1_data = np.where(mask, parent1.data, parent2.data)
+        child2_data = np.where(mask, parent2.data, parent1.data)
+
+        return (TimetableChromosome(child1_data, self._crossover_index(parent1, parent2, mask)),
+                TimetableChromosome(child2_data, self._crossover_index(parent2, parent1, mask)))
+
+    def crossover_population(self, population, first, second, masks, children):
+        # Crossover of every pair at once with masked copies: children are
+        # rows of a preallocated block (every other row for the first child
+        # of each pair, the rows in between for the second). Parents are
+        # gathered into scratch storage first.
+        buffers = self.buffers
+        n_pairs = len(masks)
+        heads = np.take(buffers.matrix, first, axis=0, out=buffers.scratch[0][:n_pairs], mode='clip')
+        tails = np.take(buffers.matrix, second, axis=0, out=buffers.scratch[1][:n_pairs], mode='clip')
+        from_first = masks[:, None, :]
+
+        block = buffers.back_matrix[self._elite_count(population):]
+        for offset, (kept, swapped) in enumerate(((heads, tails), (tails, heads))):
+            rows = block[offset::2]
+            count = len(rows)
+            np.copyto(rows, swapped[:count])
+            np.copyto(rows, kept[:count], where=from_first[:count])
+
+        for position, child in enumerate(children):
+            pair, offset = divmod(position, 2)
+            base, donor = (first[pair], second[pair]) if offset == 0 else (second[pair], first[pair])
+            child.index = self._crossover_index(population[base], population[donor], masks[pair])
+            child.fitness = child.index.fitness if child.index is not None else None
+            child.genes = None
+
+    def _crossover_index(self, base, donor, mask):
+        # Rebuild the child's counters from its first parent's by swapping in
+        # only the donated genes (outside mask) that differ between the parents
+        if base.index is None:
+            return None
+        index = base.index.copy()
+        changed = np.flatnonzero(~mask & (base.data != donor.data).any(axis=0))
+        for position in changed.tolist():
+            index.remove(*base.data[:, position].tolist())
+            index.add(*donor.data[:, position].tolist())
+        return index
+
+    def mutate(self, chromosome: TimetableChromosome, problem: ProblemInstance):
+        mutated = np.flatnonzero(self.rng.random(len(chromosome)) < self.mutation_rate)
+        if not mutated.size:
+            return
+
+        # Change one attribute (slot, day, venue or instructor) per mutated
+        # gene. With windows or reservations, sample only values that are
+        # free and outside every window; that needs this chromosome's
+        # occupancy, rebuilt here. Without them the rebuild would cost more
+        # than the whole rest of the generation, so values are drawn
+        # uniformly (block starts only where a block fits) and the
+        # ConflictIndex prices any clash.
+        mutation_types = self.rng.integers(len(MOVE_ROWS), size=mutated.size)
+        draws = self.rng.integers(RANDOM_DRAW, size=mutated.size)
+        moves = zip(mutated.tolist(), mutation_types.tolist(), draws.tolist())
+        if not self.availability.constrained:
+            availability = self.availability
+            for gene, mutation_type, draw in moves:
+                row = MOVE_ROWS[mutation_type]
+                values = None
+                if row == SLOT and availability.multi_period:
+                    values = availability.allowed_values(*chromosome.data[INSTRUCTOR:, gene].tolist(), row)
+                value = values[draw % len(values)] if values else draw % domain_size(problem, row)
+                chromosome.set_gene(gene, row, value)
+            return
+        availability = self.availability.build(chromosome.data)
+        for gene, mutation_type, draw in moves:
+            row = MOVE_ROWS[mutation_type]
+            availability.resample(chromosome, gene, row, draw, domain_size(problem, row))
+
+    def evolve(self, programme, semester, year_of_study, problem: ProblemInstance = None) -> TimetableChromosome:
+        # Load the problem domain once; callers may pass a snapshot to reuse across runs.
+        # The load is the run's only database work, so its queries are counted here.
+        metrics = RunMetrics() if self.collect_metrics else NULL_METRICS
+        started = time.monotonic()
+        if problem is None:
+            with metrics.count_queries():
+                phase_started = metrics.clock()
+                try:
+                    problem = ProblemInstance.load(programme, semester, year_of_study)
+                except Exception:
+                    logger.exception("Error loading timetable problem")
+                    raise
+                metrics.add('load', phase_started)
+        return self.run(problem, metrics, started)
+
+    def run(self, problem: ProblemInstance, metrics=None, started=None) -> TimetableChromosome:
+        self.problem = problem
+        self.best = None
+        self.buffers = None
+        self.generations_run = 0
+        self.stop_reason = None
+        self._stop_requested = False
+        if metrics is None:
+            metrics = RunMetrics() if self.collect_metrics else NULL_METRICS
+        self.metrics = metrics
+        started = started if started is not None else time.monotonic()
+        deadline = started + self.time_limit if self.time_limit is not None else None
+        last_improvement = 0
+
+        with metrics.count_queries():
+            # Initialize population
+            phase_started = metrics.clock()
+            population = self.initialize_population(problem)
+            metrics.add('initialize', phase_started)
+
+            # Evolution loop
+            for generation in range(self.generations + 1):
+                self._evaluate_unscored(population)
+                if self._record_best(population):
+                    last_improvement = generation
+
+                self.stop_reason = self._stop_reason(generation, last_improvement, deadline)
+                if self.stop_reason:
+                    break
+                self._report('running', generation, started)
+
+                population = self.next_generation(population, problem)
+                self.generations_run = generation + 1
+
+        metrics.generations = self.generations_run
+        metrics.finish(time.monotonic() - started)
+        self._report('finished', self.generations_run, started)
+
+        # Return best solution, resolving model instances only once
+        return self.best_so_far()
+
+    def _report(self, stage, generation, started):
+        if self.progress is not None:
+            self.progress(ProgressEvent(stage, generation, self.best.fitness, time.monotonic() - started,
+                                        'genetic', self.stop_reason))
+
+    def _record_best(self, population: List[TimetableChromosome]) -> bool:
+        candidate = max(population, key=lambda x: x.fitness)
+        if self.best is None or candidate.fitness > self.best.fitness:
+            # A copy: population storage is reused by later generations
+            self.best = candidate.copy()
+            return True
+        return False
+
+    def _stop_reason(self, generation, last_improvement, deadline):
+        if self.target_fitness is not None and self.best.fitness >= self.target_fitness:
+            return 'target'
+        if self._stop_requested:
+            return 'stopped'
+        if deadline is not None and time.monotonic() >= deadline:
+            return 'deadline'
+        if self.stall_generations is not None and generation - last_improvement >= self.stall_generations:
+            return 'stalled'
+        if generation >= self.generations:
+            return 'generations'
+        return None
+
+    def stop(self):
+        # Ask a running run() to finish after the current generation
+        self._stop_requested = True
+
+    def best_so_far(self) -> TimetableChromosome:
+        best = self.best
+        if best is not None and best.genes is None:
+            best.genes = best.decode(self.problem)
+        return best
+
+    def next_generation(self, population: List[TimetableChromosome], problem: ProblemInstance) -> List[TimetableChromosome]:
+        if self.double_buffer:
+            buffers = self.buffers
+            if buffers is None or population is not buffers.current:
+                # The first generation, or a population handed in by an island
+                buffers = self.buffers = PopulationBuffers.holding(population, self.population_size)
+                population = buffers.current
+
+        # Score, in one batch, only chromosomes whose fitness is not already known
+        self._evaluate_unscored(population)
+        fitness = np.array([chromosome.fitness for chromosome in population])
+
+        # Keep elite chromosomes
+        elites = np.argsort(-fitness, kind='stable')[:self._elite_count(population)].tolist()
+        n_children = self.population_size - len(elites)
+
+        metrics = self.metrics
+
+        # Selection
+        started = metrics.clock()
+        parents = self.tournament(fitness)
+        metrics.add('select', started)
+
+        # Crossover
+        started = metrics.clock()
+        if self.double_buffer:
+            days = self.buffers.matrix[:, DAY]
+        else:
+            days = np.stack([chromosome.day for chromosome in population])
+        first, second, masks = self.pair_parents(parents, n_children, days)
+        if self.double_buffer:
+            new_population = self.buffers.back
+            for chromosome, elite in zip(new_population, elites):
+                chromosome.assign(population[elite])
+            self.crossover_population(population, first, second, masks, new_population[len(elites):])
+        else:
+            new_population = [population[elite] for elite in elites]
+            for parent1, parent2, mask in zip(first.tolist(), second.tolist(), masks):
+                new_population.extend(self._crossover_masked(population[parent1], population[parent2], mask))
             # Trim population to original size
             new_population = new_population[:self.population_size]
-            
-            # Mutation
-            for chromosome in new_population[self.elite_size:]:
-                self.mutate(chromosome)
-            
-            population = new_population
-            
-            # Print progress
-            best_fitness = max(population, key=lambda x: x.fitness).fitness
-            print(f"Generation {generation}: Best Fitness = {best_fitness}")
-        
-        # Return best solution
-        return max(population, key=lambda x: x.fitness) 
\ No newline at end of file
+        metrics.add('crossover', started, len(masks))
+
+        # Mutation
+        started = metrics.clock()
+        for chromosome in new_population[len(elites):]:
+            self.mutate(chromosome, problem)
+        metrics.add('mutate', started, n_children)
+
+        if self.double_buffer:
+            self.buffers.swap()
+            new_population = self.buffers.current
+
+        # Local search repair
+        if self.local_search is not None:
+            started = metrics.clock()
+            self.repair(new_population, problem)
+            metrics.add('repair', started)
+
+        return new_population
+
+    def _elite_count(self, population):
+        return min(self.elite_size, self.population_size, len(population))
+
+    def repair(self, population: List[TimetableChromosome], problem: ProblemInstance):
+        if self.local_search_on == 'elite':
+            # In place: the recorded best individual is a separate copy
+            for position in range(min(self.elite_size, len(population))):
+                self.local_search.improve(population[position], self.fitness_engine, problem)
+        else:
+            for chromosome in population[self.elite_size:]:
+                self.local_search.improve(chromosome, self.fitness_engine, problem)
+
+    def best_of(self, population: List[TimetableChromosome]) -> TimetableChromosome:
+        self._evaluate_unscored(population)
+        return max(population, key=lambda x: x.fitness)
@@ -0,0 +1,162 @@
+import os
+import pickle
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from .genetic_algorithm import GeneticTimetableAlgorithm, TimetableChromosome
+from .problem import ProblemInstance
+
+
+# Migration topologies return the (source, target) island pairs for one exchange
+def ring_topology(n_islands, rng):
+    return [(i, (i + 1) % n_islands) for i in range(n_islands)]
+
+
+def fully_connected_topology(n_islands, rng):
+    return [(i, j) for i in range(n_islands) for j in range(n_islands) if i != j]
+
+
+def random_topology(n_islands, rng):
+    pairs = []
+    for i in range(n_islands):
+        target = int(rng.integers(n_islands - 1))
+        pairs.append((i, target if target < i else target + 1))
+    return pairs
+
+
+MIGRATION_TOPOLOGIES = {
+    'ring': ring_topology,
+    'fully_connected': fully_connected_topology,
+    'random': random_topology,
+}
+
+
+# Each worker process unpickles the problem once and keeps it for every epoch
+_worker_problem = None
+
+
+def _init_worker(problem_bytes):
+    global _worker_problem
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    _worker_problem = pickle.loads(problem_bytes)
+
+
+def _evolve_island(ga_kwargs, population, fitness, generations, seed):
+    # Runs one epoch of an island and ships the population back as a plain
+    # (population, fields, genes) matrix plus fitness vector
+    ga = GeneticTimetableAlgorithm(seed=seed, **ga_kwargs)
+    problem = _worker_problem
+
+    if population is None:
+        chromosomes = ga.initialize_population(problem)
+    else:
+        ga.prepare(problem)
+        chromosomes = []
+        for data, score in zip(population, fitness.tolist()):
+            chromosome = TimetableChromosome(data.copy())
+            chromosome.fitness = score
+            chromosomes.append(chromosome)
+
+    for _ in range(generations):
+        chromosomes = ga.next_generation(chromosomes, problem)
+
+    ga._evaluate_unscored(chromosomes)
+    chromosomes.sort(key=lambda x: x.fitness, reverse=True)
+    return (np.stack([chromosome.data for chromosome in chromosomes]),
+            np.array([chromosome.fitness for chromosome in chromosomes]))
+
+
+class IslandModel:
+    # Runs n_islands independent GA sub-populations on a process pool and
+    # exchanges the best individuals every migration_interval generations
+    def __init__(self,
+                 n_islands=4,
+                 migration_interval=10,
+                 migration_size=2,
+                 topology='ring',
+                 generations=100,
+                 max_workers=None,
+                 seed=None,
+                 **ga_kwargs):
+        if topology not in MIGRATION_TOPOLOGIES:
+            raise ValueError(f"Unknown migration topology: {topology}")
+        if n_islands < 2:
+            raise ValueError("An island model needs at least two islands")
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = topology
+        self.generations = generations
+        self.max_workers = max_workers or min(n_islands, os.cpu_count() or 1)
+        self.ga_kwargs = ga_kwargs
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        self.islands = [(None, None)] * n_islands
+        self.best = None
+
+    def run(self, problem: ProblemInstance) -> TimetableChromosome:
+        problem_bytes = pickle.dumps(problem)
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(problem_bytes,)) as executor:
+            completed = 0
+            while completed < self.generations:
+                epoch = min(self.migration_interval, self.generations - completed)
+                seeds = [int(s.generate_state(1)[0]) for s in self.seed_sequence.spawn(self.n_islands)]
+                futures = [
+                    executor.submit(_evolve_island, self.ga_kwargs, population, fitness, epoch, seed)
+                    for (population, fitness), seed in zip(self.islands, seeds)
+                ]
+                self.islands = [future.result() for future in futures]
+                completed += epoch
+                self._update_best()
+                if completed < self.generations:
+                    self.migrate()
+
+        best = self.best
+        best.genes = best.decode(problem)
+        return best
+
+    def migrate(self):
+        # Every target collects the best individuals of its sources and lets
+        # the fittest of them replace its own worst individuals
+        pairs = MIGRATION_TOPOLOGIES[self.topology](self.n_islands, self.rng)
+        size = self.migration_size
+        incoming = {target: [] for _, target in pairs}
+        for source, target in pairs:
+            population, fitness = self.islands[source]
+            incoming[target].extend(zip(fitness[:size].tolist(), population[:size]))
+
+        islands = list(self.islands)
+        for target, migrants in incoming.items():
+            population, fitness = islands[target]
+            population, fitness = population.copy(), fitness.copy()
+            migrants.sort(key=lambda migrant: migrant[0], reverse=True)
+            migrants = migrants[:min(size, len(population))]
+            for position, (score, data) in enumerate(migrants, start=len(population) - len(migrants)):
+                population[position] = data
+                fitness[position] = score
+            order = np.argsort(-fitness, kind='stable')
+            islands[target] = (population[order], fitness[order])
+        self.islands = islands
+
+    def _update_best(self):
+        for population, fitness in self.islands:
+            if self.best is None or fitness[0] > self.best.fitness:
+                best = TimetableChromosome(population[0].copy())
+                best.fitness = float(fitness[0])
+                self.best = best
+
+    def best_per_island(self) -> List[TimetableChromosome]:
+        best = []
+        for population, fitness in self.islands:
+            if population is None:
+                continue
+            chromosome = TimetableChromosome(population[0].copy())
+            chromosome.fitness = float(fitness[0])
+            best.append(chromosome)
+        return best
@@ -0,0 +1,146 @@
+import numpy as np
+from collections import Counter, defaultdict
+
+from ..models import TimeTableMain, Instructor, Venue, CourseName
+from .base import Budget
+from .problem import ProblemInstance, time_grid_options
+
+
+class SharedOccupancy:
+    # Global booking index for the resources programmes share. Bookings are
+    # keyed by the instructor or venue itself and by the (day, start, end)
+    # of each session. Programmes may run on different time grids, so two
+    # bookings clash when their times overlap on the same day, not only when
+    # they start together.
+    def __init__(self):
+        self.instructors = defaultdict(Counter)
+        self.venues = defaultdict(Counter)
+
+    @staticmethod
+    def intervals(solution):
+        # (gene, (day, time_start, time_end)); a multi-period session is one
+        # interval over every period it covers
+        for gene in solution.genes:
+            yield gene, (gene.day, gene.time_start, gene.time_end)
+
+    @staticmethod
+    def overlapping(bookings, day, start, end) -> int:
+        return sum(count for (booked_day, booked_start, booked_end), count in bookings.items()
+                   if booked_day == day and booked_start < end and start < booked_end)
+
+    def book(self, solution, count=1):
+        for gene, key in self.intervals(solution):
+            self.instructors[gene.instructor][key] += count
+            self.venues[gene.venue][key] += count
+
+    def release(self, solution):
+        self.book(solution, count=-1)
+
+    def reservations(self, problem):
+        # Project the bookings onto one programme's own resource indices and
+        # onto every cell of its grid that a booked interval overlaps
+        days = {day: d for d, day in enumerate(problem.days)}
+        return (self._grid(self.instructors, problem.instructors, days, problem.time_slots),
+                self._grid(self.venues, problem.venues, days, problem.time_slots))
+
+    @staticmethod
+    def _grid(bookings, resources, days, time_slots):
+        n_slots = len(time_slots)
+        grid = np.zeros((len(resources), len(days) * n_slots), dtype=np.int32)
+        for row, resource in enumerate(resources):
+            for (day, start, end), count in bookings.get(resource, {}).items():
+                if not count or day not in days:
+                    continue
+                for slot, (slot_start, slot_end) in enumerate(time_slots):
+                    if start < slot_end and slot_start < end:
+                        grid[row, days[day] * n_slots + slot] += count
+        return grid
+
+    def clashes(self, solution=None) -> int:
+        # Double bookings across programmes, overall or those touching one solution
+        total = 0
+        if solution is None:
+            for bookings in (self.instructors, self.venues):
+                for counter in bookings.values():
+                    booked = [(key, count) for key, count in counter.items() if count]
+                    for position, ((day, start, end), count) in enumerate(booked):
+                        total += count * (count - 1) // 2
+                        total += count * self.overlapping(dict(booked[position + 1:]), day, start, end)
+            return total
+        for gene, (day, start, end) in self.intervals(solution):
+            total += self.overlapping(self.instructors[gene.instructor], day, start, end) - 1
+            total += self.overlapping(self.venues[gene.venue], day, start, end) - 1
+        return total
+
+
+def load_semester_problems(semester, **kwargs):
+    # Every TimeTableMain of a semester with six queries in total, however
+    # many programmes there are; filtering happens in memory
+    mains = list(TimeTableMain.objects.select_related('Department', 'TimeGrid')
+                 .prefetch_related('TimeGrid__slots', 'TimeGrid__session_lengths')
+                 .filter(Semister=semester).order_by('Department', 'Programme', 'YearOfStudy'))
+    courses = list(CourseName.objects.order_by('CourseCode'))
+    instructors = list(Instructor.objects.select_related('user').order_by('pk'))
+    venues = list(Venue.objects.order_by('Venue'))
+
+    by_department = defaultdict(list)
+    for instructor in instructors:
+        by_department[instructor.user.department_id].append(instructor)
+
+    problems = []
+    for timetable_main in mains:
+        department = timetable_main.Department
+        dept_prefix = department.DepartmentName.split()[0][:2].upper()
+        programme_courses = [course for course in courses if course.CourseCode.startswith(dept_prefix)] or courses
+        programme_instructors = by_department.get(department.pk) or instructors
+        options = dict(time_grid_options(timetable_main.TimeGrid), **kwargs)
+        problems.append(ProblemInstance(programme_courses, programme_instructors, venues,
+                                        timetable_main=timetable_main, **options))
+    return problems
+
+
+class JointScheduler:
+    # Schedules many programmes against one SharedOccupancy. Programmes are
+    # decomposed per department and solved one at a time, each seeing the
+    # bookings of everything solved so far as reservations, so they couple
+    # only through the instructors and venues they actually share. Later
+    # passes re-solve just the programmes still involved in a double booking.
+    def __init__(self, solver=None, budget=None, passes=2):
+        if solver is None:
+            from .solvers import get_solver
+            solver = get_solver()
+        self.solver = solver
+        self.budget = budget or Budget()
+        self.passes = passes
+        self.occupancy = None
+
+    @staticmethod
+    def departments(problems):
+        groups = defaultdict(list)
+        for problem in problems:
+            department = problem.department
+            groups[department.pk if department is not None else None].append(problem)
+        # Largest departments first: they are the hardest to fit around others
+        return sorted(groups.values(), key=len, reverse=True)
+
+    def solve(self, problems):
+        occupancy = SharedOccupancy()
+        solutions = {}
+        for _ in range(self.passes):
+            changed = False
+            for members in self.departments(problems):
+                for problem in members:
+                    previous = solutions.get(problem)
+                    if previous is not None:
+                        if not occupancy.clashes(previous):
+                            continue
+                        occupancy.release(previous)
+                    coupled = problem.with_reservations(*occupancy.reservations(problem))
+                    solution = self.solver.solve(coupled, self.budget)
+                    occupancy.book(solution)
+                    solutions[problem] = solution
+                    changed = True
+            if not changed or not occupancy.clashes():
+                break
+        self.occupancy = occupancy
+        return solutions
@@ -0,0 +1,129 @@
+import numpy as np
+
+from .encoding import INSTRUCTOR, VENUE, DAY, SLOT
+from .fitness import ConflictIndex
+from .availability import GridAvailability
+
+
+# Attributes a repair or search move may change
+MOVE_ROWS = (SLOT, DAY, VENUE, INSTRUCTOR)
+
+
+def domain_size(problem, row):
+    if row == SLOT:
+        return len(problem.time_slots)
+    if row == DAY:
+        return len(problem.days)
+    if row == VENUE:
+        return len(problem.venues)
+    return len(problem.instructors)
+
+
+def conflicted_genes(chromosome, index):
+    # Genes sitting in a shared occupancy bucket or on a day outside the limits
+    engine = index.engine
+    conflicted = []
+    for position, gene in enumerate(chromosome.data.T.tolist()):
+        if index.gene_clashes(*gene):
+            conflicted.append(position)
+            continue
+        count = index.lectures_per_day[gene[DAY]]
+        if count < engine.min_lectures_per_day or count > engine.max_lectures_per_day:
+            conflicted.append(position)
+    return conflicted
+
+
+def indexed(chromosome, engine):
+    # Attach a ConflictIndex to a chromosome that does not carry one yet
+    if chromosome.index is None:
+        chromosome.index = ConflictIndex.build(engine, chromosome)
+        chromosome.fitness = chromosome.index.fitness
+    return chromosome.index
+
+
+class LocalSearch:
+    # Repairs a chromosome in place with moves over slot, day, venue and
+    # instructor. Every move goes through TimetableChromosome.set_gene, so the
+    # ConflictIndex prices it in O(1). max_moves bounds the number of
+    # candidate values tried per call. Values inside unavailability windows
+    # are never tried.
+
+    def __init__(self, max_moves=100, rng=None):
+        self.max_moves = max_moves
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._availability = (None, None)
+
+    def availability(self, problem):
+        # GridAvailability of the problem, built once per problem
+        cached_problem, availability = self._availability
+        if cached_problem is not problem:
+            availability = GridAvailability.for_problem(problem)
+            self._availability = (problem, availability)
+        return availability
+
+    def improve(self, chromosome, engine, problem) -> int:
+        raise NotImplementedError
+
+
+class HillClimbing(LocalSearch):
+    # First-improvement: move a conflicted gene to a free value sampled from
+    # the availability bitmasks and keep it only if the conflict count drops
+    def improve(self, chromosome, engine, problem) -> int:
+        index = indexed(chromosome, engine)
+        availability = self.availability(problem).build(chromosome.data)
+        accepted = 0
+        for _ in range(self.max_moves):
+            conflicts = index.conflicts
+            if not conflicts:
+                break
+            conflicted = conflicted_genes(chromosome, index)
+            if not conflicted:
+                break
+            position = conflicted[int(self.rng.integers(len(conflicted)))]
+            row = MOVE_ROWS[int(self.rng.integers(len(MOVE_ROWS)))]
+            previous = int(chromosome.data[row, position])
+            availability.resample(chromosome, position, row, int(self.rng.integers(1 << 30)), domain_size(problem, row))
+            if index.conflicts < conflicts:
+                accepted += 1
+            else:
+                availability.move(chromosome, position, row, previous)
+        return accepted
+
+
+class MinConflicts(LocalSearch):
+    # Pick a conflicted gene and an attribute, then move it to the value with
+    # the fewest conflicts (ties broken randomly)
+    def improve(self, chromosome, engine, problem) -> int:
+        index = indexed(chromosome, engine)
+        availability = self.availability(problem)
+        budget = self.max_moves
+        accepted = 0
+        while budget > 0 and index.conflicts:
+            conflicted = conflicted_genes(chromosome, index)
+            if not conflicted:
+                break
+            position = conflicted[int(self.rng.integers(len(conflicted)))]
+            row = MOVE_ROWS[int(self.rng.integers(len(MOVE_ROWS)))]
+            previous = int(chromosome.data[row, position])
+            current = index.conflicts
+
+            instructor, venue, day, slot, session = chromosome.data[INSTRUCTOR:, position].tolist()
+            allowed = (availability.allowed_values(instructor, venue, day, slot, session, row)
+                       or range(domain_size(problem, row)))
+            values = self.rng.permutation(allowed)[:budget]
+            budget -= len(values)
+            best_value, best_conflicts = previous, current
+            for value in values.tolist():
+                chromosome.set_gene(position, row, value)
+                if index.conflicts < best_conflicts:
+                    best_value, best_conflicts = value, index.conflicts
+            chromosome.set_gene(position, row, best_value)
+            if best_conflicts < current:
+                accepted += 1
+        return accepted
+
+
+LOCAL_SEARCHES = {
+    'hill_climbing': HillClimbing,
+    'min_conflicts': MinConflicts,
+}
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('load', 'initialize', 'evaluate', 'select', 'crossover', 'mutate', 'repair')
+
+
+class RunMetrics:
+    # Cumulative wall-clock seconds and call counts per GA phase, plus the
+    # number of chromosomes actually scored and DB queries issued. Phases
+    # are timed around whole loops, once per generation, so the overhead
+    # does not grow with population size.
+    enabled = True
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.evaluations = 0
+        self.cache_hits = 0
+        self.queries = 0
+        self.generations = 0
+        self.elapsed = 0.0
+
+    @staticmethod
+    def clock():
+        return time.perf_counter()
+
+    def add(self, phase, started, calls=1):
+        self.seconds[phase] += time.perf_counter() - started
+        self.calls[phase] += calls
+
+    def evaluated(self, scored, hits=0):
+        self.evaluations += scored
+        self.cache_hits += hits
+
+    @property
+    def evaluations_per_second(self):
+        seconds = self.seconds['evaluate']
+        return self.evaluations / seconds if seconds else 0.0
+
+    @contextmanager
+    def count_queries(self):
+        def wrapper(execute, sql, params, many, context):
+            self.queries += 1
+            return execute(sql, params, many, context)
+        with connection.execute_wrapper(wrapper):
+            yield
+
+    def as_dict(self):
+        return {
+            'elapsed': self.elapsed,
+            'generations': self.generations,
+            'evaluations': self.evaluations,
+            'cache_hits': self.cache_hits,
+            'evaluations_per_second': self.evaluations_per_second,
+            'queries': self.queries,
+            'phases': {phase: {'seconds': self.seconds[phase], 'calls': self.calls[phase]}
+                       for phase in PHASES if self.calls[phase]},
+        }
+
+    def finish(self, elapsed):
+        self.elapsed = elapsed
+        REGISTRY.record(self)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("timetable run: %s", self.as_dict())
+
+
+class NullMetrics:
+    # Stand-in used when metrics are off; every hook is a no-op
+    enabled = False
+    evaluations = cache_hits = queries = generations = 0
+
+    @staticmethod
+    def clock():
+        return 0.0
+
+    def add(self, phase, started, calls=1):
+        pass
+
+    def evaluated(self, scored, hits=0):
+        pass
+
+    @contextmanager
+    def count_queries(self):
+        yield
+
+    def finish(self, elapsed):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsRegistry:
+    # Process-wide totals over every instrumented run, rendered in the
+    # Prometheus text exposition format. Nothing is shared between
+    # processes: runs in a run_generation_jobs worker only reach its log.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.evaluations = 0
+        self.queries = 0
+
+    def record(self, metrics):
+        with self.lock:
+            self.runs += 1
+            for phase, seconds in metrics.seconds.items():
+                self.seconds[phase] += seconds
+            self.calls.update(metrics.calls)
+            self.evaluations += metrics.evaluations
+            self.queries += metrics.queries
+
+    def render(self) -> str:
+        with self.lock:
+            lines = [
+                '# HELP timetable_runs_total Instrumented timetable runs.',
+                '# TYPE timetable_runs_total counter',
+                f'timetable_runs_total {self.runs}',
+                '# HELP timetable_phase_seconds_total Seconds spent per GA phase.',
+                '# TYPE timetable_phase_seconds_total counter',
+            ]
+            lines += [f'timetable_phase_seconds_total{{phase="{phase}"}} {self.seconds[phase]:.6f}'
+                      for phase in PHASES if phase in self.seconds]
+            lines += [
+                '# HELP timetable_phase_calls_total Calls per GA phase.',
+                '# TYPE timetable_phase_calls_total counter',
+            ]
+            lines += [f'timetable_phase_calls_total{{phase="{phase}"}} {self.calls[phase]}'
+                      for phase in PHASES if phase in self.calls]
+            lines += [
+                '# HELP timetable_evaluations_total Chromosomes scored by the fitness engine.',
+                '# TYPE timetable_evaluations_total counter',
+                f'timetable_evaluations_total {self.evaluations}',
+                '# HELP timetable_db_queries_total Database queries issued during runs.',
+                '# TYPE timetable_db_queries_total counter',
+                f'timetable_db_queries_total {self.queries}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,212 @@
+import numpy as np
+
+from ..models import TimeTableMain, Instructor, Venue, CourseName
+
+DEFAULT_DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+# Continuous time slots from 10:00 to 17:00 with lunch break
+DEFAULT_TIME_SLOTS = (
+    ('10:00', '11:00'),
+    ('11:00', '12:00'),
+    ('12:00', '13:00'),
+    # Lunch break 13:00-14:00
+    ('14:00', '15:00'),
+    ('15:00', '16:00'),
+    ('16:00', '17:00'),
+)
+DEFAULT_SESSION_TYPES = ('Lecture', 'Tutorial', 'Lab')
+# Every session type fills a single period unless a TimeGrid says otherwise
+DEFAULT_SESSION_LENGTH = 1
+
+
+class ProblemInstance:
+    # Immutable snapshot of everything a solver needs for one TimeTableMain.
+    # The integer gene encoding indexes into these tuples, so once loaded a
+    # run never has to go back to the database, and the same instance can be
+    # reused for any number of runs.
+    #
+    # reserved_instructors / reserved_venues optionally hold, per resource and
+    # (day, slot) cell, how many sessions other programmes already booked
+    # there, as (n_resources, n_days * n_slots) count grids. Genes landing on a
+    # reserved cell count as clashes.
+    #
+    # instructor_windows / venue_windows optionally hold, per resource, an
+    # integer bitmask of (day, slot) cells (bit day * n_slots + slot) where it
+    # is unavailable. Solvers never sample those cells and placements there
+    # count as clashes.
+    #
+    # session_lengths gives, per session type, how many consecutive periods
+    # a session takes (a double lab is 2). A gene's slot is then the first
+    # period of its block; slot_runs[slot] is how many back-to-back periods
+    # start there, so a block fits iff its length <= slot_runs[slot].
+    def __init__(self, courses, instructors, venues,
+                 days=DEFAULT_DAYS, time_slots=DEFAULT_TIME_SLOTS,
+                 session_types=DEFAULT_SESSION_TYPES, timetable_main=None,
+                 reserved_instructors=None, reserved_venues=None,
+                 instructor_windows=None, venue_windows=None,
+                 session_lengths=None):
+        if not courses or not instructors or not venues:
+            raise ValueError("A timetable needs at least one course, instructor and venue")
+        set_attr = super().__setattr__
+        set_attr('courses', tuple(courses))
+        set_attr('instructors', tuple(instructors))
+        set_attr('venues', tuple(venues))
+        set_attr('days', tuple(days))
+        set_attr('time_slots', tuple(tuple(slot) for slot in time_slots))
+        set_attr('session_types', tuple(session_types))
+        set_attr('session_lengths', self._session_lengths(session_lengths, len(self.session_types)))
+        set_attr('slot_runs', self._slot_runs(self.time_slots))
+        set_attr('timetable_main', timetable_main)
+        if not self.days or not self.time_slots or not self.session_types:
+            raise ValueError("A timetable needs at least one day, time slot and session type")
+        if self.max_session_length > max(self.slot_runs):
+            raise ValueError("No run of consecutive time slots is long enough for the longest session")
+        n_cells = len(self.days) * len(self.time_slots)
+        set_attr('reserved_instructors', self._reservation_grid(reserved_instructors, len(self.instructors), n_cells))
+        set_attr('reserved_venues', self._reservation_grid(reserved_venues, len(self.venues), n_cells))
+        set_attr('instructor_windows', self._windows(instructor_windows, len(self.instructors)))
+        set_attr('venue_windows', self._windows(venue_windows, len(self.venues)))
+
+    @staticmethod
+    def _reservation_grid(grid, n_resources, n_cells):
+        if grid is None:
+            return None
+        grid = np.array(grid, dtype=np.int32).reshape(n_resources, n_cells)
+        if not grid.any():
+            return None
+        grid.setflags(write=False)
+        return grid
+
+    @staticmethod
+    def _session_lengths(lengths, n_types):
+        if lengths is None:
+            return (DEFAULT_SESSION_LENGTH,) * n_types
+        lengths = tuple(int(length) for length in lengths)
+        if len(lengths) != n_types or min(lengths) < 1:
+            raise ValueError("Expected a positive length per session type")
+        return lengths
+
+    @staticmethod
+    def _slot_runs(time_slots):
+        # Walk backwards: a slot continues the run of the next one when it
+        # ends exactly where the next one starts (no break in between)
+        runs = [1] * len(time_slots)
+        for slot in range(len(time_slots) - 2, -1, -1):
+            if time_slots[slot][1] == time_slots[slot + 1][0]:
+                runs[slot] = runs[slot + 1] + 1
+        return tuple(runs)
+
+    @property
+    def max_session_length(self):
+        return max(self.session_lengths)
+
+    def session_plan(self, periods_per_day):
+        # Fixed weekly list of (day, slot, session type) for multi-period
+        # problems: each day is packed run by run with the least planned
+        # session type whose block still fits. Every chromosome built from it
+        # has the same gene count and session row, so crossover and batched
+        # scoring keep working; the (day, slot) layout is clash free to begin with.
+        n_slots = len(self.time_slots)
+        plan = []
+        planned = [0] * len(self.session_types)
+        for day in range(len(self.days)):
+            budget = min(periods_per_day, n_slots)
+            slot = 0
+            while slot < n_slots and budget > 0:
+                fitting = [session for session, length in enumerate(self.session_lengths)
+                           if length <= min(self.slot_runs[slot], budget)]
+                if not fitting:
+                    slot += 1
+                    continue
+                session = min(fitting, key=lambda session: planned[session])
+                planned[session] += 1
+                plan.append((day, slot, session))
+                budget -= self.session_lengths[session]
+                slot += self.session_lengths[session]
+        return plan
+
+    @staticmethod
+    def _windows(windows, n_resources):
+        if windows is None or not any(windows):
+            return None
+        windows = tuple(int(mask) for mask in windows)
+        if len(windows) != n_resources:
+            raise ValueError("Expected one unavailability mask per resource")
+        return windows
+
+    def cell_mask(self, cells) -> int:
+        # Bitmask for an iterable of (day index, slot index) cells
+        n_slots = len(self.time_slots)
+        mask = 0
+        for day, slot in cells:
+            mask |= 1 << day * n_slots + slot
+        return mask
+
+    def with_reservations(self, reserved_instructors, reserved_venues):
+        # Same domain, coupled to bookings held elsewhere
+        return ProblemInstance(self.courses, self.instructors, self.venues,
+                               days=self.days, time_slots=self.time_slots,
+                               session_types=self.session_types,
+                               timetable_main=self.timetable_main,
+                               reserved_instructors=reserved_instructors,
+                               reserved_venues=reserved_venues,
+                               instructor_windows=self.instructor_windows,
+                               venue_windows=self.venue_windows,
+                               session_lengths=self.session_lengths)
+
+    @property
+    def has_reservations(self):
+        return self.reserved_instructors is not None or self.reserved_venues is not None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProblemInstance is immutable")
+
+    @property
+    def department(self):
+        return self.timetable_main.Department if self.timetable_main is not None else None
+
+    @classmethod
+    def load(cls, programme, semester, year_of_study, **kwargs):
+        timetable_main = TimeTableMain.objects.select_related('Department', 'TimeGrid').get(
+            Programme=programme,
+            Semister=semester,
+            YearOfStudy=year_of_study
+        )
+        return cls.from_timetable_main(timetable_main, **kwargs)
+
+    @classmethod
+    def from_timetable_main(cls, timetable_main, **kwargs):
+        # A fixed handful of queries, each evaluated exactly once
+        department = timetable_main.Department
+        dept_prefix = department.DepartmentName.split()[0][:2].upper()
+
+        courses = list(CourseName.objects.filter(CourseCode__startswith=dept_prefix).order_by('CourseCode'))
+        if not courses:
+            courses = list(CourseName.objects.order_by('CourseCode'))
+
+        instructors = list(Instructor.objects.select_related('user').filter(user__department=department).order_by('pk'))
+        if not instructors:
+            instructors = list(Instructor.objects.select_related('user').order_by('pk'))
+
+        venues = list(Venue.objects.order_by('Venue'))
+
+        kwargs = dict(time_grid_options(timetable_main.TimeGrid), **kwargs)
+        return cls(courses, instructors, venues, timetable_main=timetable_main, **kwargs)
+
+
+def time_grid_options(time_grid, session_types=DEFAULT_SESSION_TYPES):
+    # ProblemInstance keyword arguments for a TimeGrid; an empty dict (the
+    # built-in week) when there is none. Session types without a configured
+    # length take one period.
+    if time_grid is None:
+        return {}
+    options = {}
+    days = time_grid.day_list
+    if days:
+        options['days'] = tuple(days)
+    slots = [(f'{slot.Timestart:%H:%M}', f'{slot.TimeEnd:%H:%M}') for slot in time_grid.slots.all()]
+    if slots:
+        options['time_slots'] = tuple(slots)
+    periods = {length.SessionType: length.Periods for length in time_grid.session_lengths.all()}
+    options['session_types'] = tuple(session_types)
+    options['session_lengths'] = tuple(periods.get(session, DEFAULT_SESSION_LENGTH) for session in session_types)
+    return options
@@ -0,0 +1,68 @@
+import time
+from django.core.cache import cache
+
+PROGRESS_TIMEOUT = 60 * 10
+
+
+class ProgressEvent:
+    # One progress report from a running solver. stage is 'running' or
+    # 'finished'; generation counts GA generations or search iterations
+    # depending on the engine.
+    def __init__(self, stage, generation, best_fitness, elapsed, solver=None, stop_reason=None):
+        self.stage = stage
+        self.generation = generation
+        self.best_fitness = best_fitness
+        self.elapsed = elapsed
+        self.solver = solver
+        self.stop_reason = stop_reason
+
+    @property
+    def conflicts(self):
+        if not self.best_fitness:
+            return None
+        return int(round(1 / self.best_fitness - 1))
+
+    def as_dict(self):
+        return {
+            'stage': self.stage,
+            'generation': self.generation,
+            'best_fitness': self.best_fitness,
+            'conflicts': self.conflicts,
+            'elapsed': round(self.elapsed, 3),
+            'solver': self.solver,
+            'stop_reason': self.stop_reason,
+        }
+
+
+class ProgressThrottle:
+    # Forwards at most one 'running' event per min_interval seconds; start
+    # and finish events always go through
+    def __init__(self, callback, min_interval=0.5):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.last = None
+
+    def __call__(self, event):
+        now = time.monotonic()
+        if event.stage == 'running' and self.last is not None and now - self.last < self.min_interval:
+            return
+        self.last = now
+        self.callback(event)
+
+
+class CacheProgress:
+    # Publishes the latest event under a token so another request (the SSE
+    # stream) can follow the run. Needs a cache shared between workers.
+    def __init__(self, token):
+        self.key = progress_key(token)
+
+    def __call__(self, event):
+        cache.set(self.key, event.as_dict(), PROGRESS_TIMEOUT)
+
+
+def progress_key(token):
+    return f'timetable:progress:{token}'
+
+
+def read_progress(token):
+    return cache.get(progress_key(token))
@@ -0,0 +1,97 @@
+import hashlib
+from django.core.cache import cache
+
+from .base import Solution
+from .genetic_algorithm import TimetableChromosome
+
+# Bumped by app.signals whenever courses, instructors, venues or programmes
+# change, which orphans every stored result at once
+VERSION_KEY = 'timetable:results:version'
+RESULT_TIMEOUT = 60 * 60 * 24
+
+
+def identity(obj):
+    return f'{type(obj).__name__}:{getattr(obj, "pk", obj)}'
+
+
+def fingerprint(problem, solver, budget) -> str:
+    # Everything a solve depends on: the problem's domain in encoding order,
+    # its time grid and session lengths, unavailability windows, any
+    # reservations, the solver and its parameters, and the budget
+    parts = [
+        identity(problem.timetable_main) if problem.timetable_main is not None else '',
+        [identity(course) for course in problem.courses],
+        [identity(instructor) for instructor in problem.instructors],
+        [identity(venue) for venue in problem.venues],
+        problem.days, problem.time_slots, problem.session_types, problem.session_lengths,
+        problem.instructor_windows, problem.venue_windows,
+        solver.name, sorted(solver_params(solver).items()),
+        budget.time_limit, budget.max_iterations, budget.target_fitness,
+    ]
+    digest = hashlib.sha256(repr(parts).encode())
+    for grid in (problem.reserved_instructors, problem.reserved_venues):
+        digest.update(grid.tobytes() if grid is not None else b'-')
+    return digest.hexdigest()
+
+
+# Solver attributes that do not affect the result
+IGNORED_PARAMS = ('rng', 'progress')
+
+
+def solver_params(solver):
+    params = getattr(solver, 'ga_kwargs', None)
+    if params is None:
+        params = vars(solver)
+    return {name: repr(value) for name, value in params.items() if name not in IGNORED_PARAMS}
+
+
+def is_deterministic(solver):
+    # Only seeded solvers give the same answer for the same inputs
+    seed = solver.ga_kwargs.get('seed') if hasattr(solver, 'ga_kwargs') else getattr(solver, 'seed', None)
+    return seed is not None
+
+
+def is_reproducible(solution, budget):
+    # A run cut off by the clock stopped wherever the machine's speed left
+    # it; one that reached the target stopped where any rerun would
+    return budget.time_limit is None or solution.stop_reason == 'target'
+
+
+def version():
+    cache.add(VERSION_KEY, 1, None)
+    return cache.get(VERSION_KEY, 1)
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def cached_solve(solver, problem, budget):
+    # Returns a stored Solution for identical inputs, solving and storing it
+    # otherwise. Unseeded solvers always solve, and only reproducible
+    # results are stored.
+    if not is_deterministic(solver):
+        return solver.solve(problem, budget)
+
+    key = f'timetable:result:{version()}:{fingerprint(problem, solver, budget)}'
+    stored = cache.get(key)
+    if stored is not None:
+        chromosome = TimetableChromosome(stored['data'])
+        chromosome.fitness = stored['fitness']
+        return Solution(chromosome, problem, stored['solver'], stored['iterations'],
+                        stored['elapsed'], 'cached')
+
+    solution = solver.solve(problem, budget)
+    if not is_reproducible(solution, budget):
+        return solution
+    cache.set(key, {
+        'data': solution.chromosome.data,
+        'fitness': solution.fitness,
+        'solver': solution.solver,
+        'iterations': solution.iterations,
+        'elapsed': solution.elapsed,
+    }, RESULT_TIMEOUT)
+    return solution
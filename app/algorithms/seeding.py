@@ -0,0 +1,107 @@
+import numpy as np
+
+from .encoding import COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION, GENE_FIELDS
+from .availability import GridAvailability
+
+
+class GreedySeeder:
+    # Builds clash-free chromosomes by colouring sessions with (day, slot)
+    # cells: no two sessions of the programme share a cell, so none of them
+    # can share an instructor, venue or course at the same time. Every course
+    # keeps one instructor for the week, courses are spread across days and
+    # venues are handed out least-used first. Cells and venues that other
+    # programmes already booked or that fall in an unavailability window
+    # (both blocked in the GridAvailability) are avoided whenever an
+    # alternative exists. A multi-period session takes a block of
+    # consecutive free cells, and capacity counts periods.
+    def __init__(self, problem, rng, min_lectures_per_day, max_lectures_per_day, availability=None):
+        self.problem = problem
+        self.rng = rng
+        self.min_lectures_per_day = min_lectures_per_day
+        self.max_lectures_per_day = max_lectures_per_day
+        self.availability = availability if availability is not None else GridAvailability.for_problem(problem)
+
+    def build(self) -> np.ndarray:
+        problem, rng = self.problem, self.rng
+        n_days, n_slots = len(problem.days), len(problem.time_slots)
+        n_courses, n_instructors, n_venues = len(problem.courses), len(problem.instructors), len(problem.venues)
+
+        lengths = problem.session_lengths
+        plan = None
+        if problem.max_session_length > 1:
+            # Same genes as every other chromosome of the problem: the
+            # session plan's types, each day holding as many periods as there
+            plan = problem.session_plan(self.min_lectures_per_day)
+            sessions = [session for day, slot, session in plan]
+            capacity = [0] * n_days
+            for day, slot, session in plan:
+                capacity[day] += lengths[session]
+        else:
+            # The same gene count as random chromosomes of the problem
+            capacity = [min(self.min_lectures_per_day, n_slots)] * n_days
+            sessions = rng.integers(len(problem.session_types), size=sum(capacity)).tolist()
+        n_genes = len(sessions)
+        # Cells a block of each length may start at
+        starts = {length: [(day, slot) for day in range(n_days) for slot in range(n_slots)
+                           if problem.slot_runs[slot] >= length]
+                  for length in set(lengths)}
+
+        # Cycle the courses in a random order and give each one a fixed instructor
+        courses = np.resize(rng.permutation(n_courses), n_genes)
+        teaches = rng.permutation(max(n_courses, n_instructors))[:n_courses] % n_instructors
+        instructors = teaches[courses]
+
+        # Colour the most constrained instructors first
+        load = np.bincount(instructors, minlength=n_instructors)
+        order = sorted(range(n_genes), key=lambda gene: (-load[instructors[gene]], rng.random()))
+
+        free_cells = {(day, slot) for day in range(n_days) for slot in range(n_slots)}
+        course_days = np.zeros((n_courses, n_days), dtype=np.int32)
+        venue_load = np.zeros(n_venues, dtype=np.int32)
+        day_load = [0] * n_days
+        availability = self.availability
+        constrained = availability.constrained
+
+        data = np.empty((GENE_FIELDS, n_genes), dtype=np.int32)
+        for gene in order:
+            course, instructor = int(courses[gene]), int(instructors[gene])
+            session = sessions[gene]
+            length = lengths[session]
+            unused = [cell for cell in starts[length]
+                      if all((cell[0], slot) in free_cells for slot in range(cell[1], cell[1] + length))]
+            # Only long sessions can run out of room: then overfill a day,
+            # and failing that accept a clash
+            candidates = [cell for cell in unused if day_load[cell[0]] + length <= capacity[cell[0]]] \
+                or unused or starts[length]
+            if constrained:
+                candidates = [cell for cell in candidates
+                              if not any(availability.instructors.is_blocked(instructor, cell[0] * n_slots + slot)
+                                         for slot in range(cell[1], cell[1] + length))] or candidates
+            # Spread each course across the week, break ties randomly
+            day, slot = min(candidates, key=lambda cell: (course_days[course, cell[0]], rng.random()))
+
+            venue_score = venue_load
+            if constrained:
+                # Blocked venues only come into play once every venue is blocked
+                blocked = 0
+                for cell in range(day * n_slots + slot, day * n_slots + slot + length):
+                    blocked |= availability.cell_venues.blocked[cell]
+                venue_score = venue_load + np.array([blocked >> venue & 1 for venue in range(n_venues)]) * n_genes
+            venue = int(rng.choice(np.flatnonzero(venue_score == venue_score.min())))
+            free_cells.difference_update((day, covered) for covered in range(slot, slot + length))
+            course_days[course, day] += 1
+            venue_load[venue] += 1
+            day_load[day] += length
+
+            data[COURSE, gene] = course
+            data[INSTRUCTOR, gene] = instructor
+            data[VENUE, gene] = venue
+            data[DAY, gene] = day
+            data[SLOT, gene] = slot
+            data[SESSION, gene] = session
+
+        if plan is not None:
+            # Genes stay in plan order so the session row matches
+            return data
+        # Keep the usual day-major gene order
+        return data[:, np.lexsort((data[SLOT], data[DAY]))]
@@ -0,0 +1,51 @@
+import time
+from django.conf import settings
+
+from .base import Budget, Solution, Solver
+from .genetic_algorithm import GeneticTimetableAlgorithm
+from .annealing import SimulatedAnnealingSolver
+from .tabu_search import TabuSearchSolver
+
+
+class GeneticSolver(Solver):
+    # The population-based GA behind the common solver interface
+    name = 'genetic'
+
+    def __init__(self, **ga_kwargs):
+        self.ga_kwargs = ga_kwargs
+
+    def solve(self, problem, budget: Budget, initial=None) -> Solution:
+        kwargs = dict(self.ga_kwargs)
+        if budget.max_iterations is not None:
+            kwargs['generations'] = budget.max_iterations
+        if budget.time_limit is not None:
+            kwargs['time_limit'] = budget.time_limit
+        if budget.target_fitness is not None:
+            kwargs['target_fitness'] = budget.target_fitness
+
+        started = time.monotonic()
+        ga = GeneticTimetableAlgorithm(**kwargs)
+        best = ga.run(problem)
+        return Solution(best, problem, self.name, ga.generations_run, time.monotonic() - started, ga.stop_reason,
+                        metrics=ga.metrics if ga.metrics.enabled else None)
+
+
+SOLVERS = {
+    GeneticSolver.name: GeneticSolver,
+    SimulatedAnnealingSolver.name: SimulatedAnnealingSolver,
+    TabuSearchSolver.name: TabuSearchSolver,
+}
+
+
+def get_solver(name=None, **kwargs) -> Solver:
+    # Falls back to the TIMETABLE_SOLVER setting when no backend is requested;
+    # per-backend defaults come from TIMETABLE_SOLVER_OPTIONS
+    name = name or getattr(settings, 'TIMETABLE_SOLVER', GeneticSolver.name)
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown timetable solver: {name}")
+    options = dict(getattr(settings, 'TIMETABLE_SOLVER_OPTIONS', {}).get(name, {}))
+    # A global TIMETABLE_SEED makes every backend deterministic
+    if getattr(settings, 'TIMETABLE_SEED', None) is not None:
+        options.setdefault('seed', settings.TIMETABLE_SEED)
+    options.update(kwargs)
+    return SOLVERS[name](**options)
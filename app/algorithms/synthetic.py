@@ -0,0 +1,39 @@
+import numpy as np
+
+from .problem import ProblemInstance, DEFAULT_SESSION_TYPES
+
+WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def synthetic_days(n_days):
+    return tuple(WEEK[i] if i < len(WEEK) else f'Day {i + 1}' for i in range(n_days))
+
+
+def synthetic_slots(n_slots, first_hour=8):
+    return tuple((f'{first_hour + i:02d}:00', f'{first_hour + i + 1:02d}:00') for i in range(n_slots))
+
+
+def synthetic_problems(n_programmes=1, n_courses=8, n_instructors=4, n_venues=4,
+                       n_days=5, n_slots=6, share=1.0, seed=None):
+    # Benchmark instances built from plain strings, no database involved.
+    # Every programme has its own courses and draws its instructors and
+    # venues from common pools; share is the fraction of each pool a
+    # programme sees, so it controls how tightly programmes are coupled.
+    rng = np.random.default_rng(seed)
+    instructors = [f'I{i}' for i in range(n_instructors)]
+    venues = [f'V{i}' for i in range(n_venues)]
+    days, slots = synthetic_days(n_days), synthetic_slots(n_slots)
+
+    problems = []
+    for programme in range(n_programmes):
+        n_shared_instructors = max(1, int(round(n_instructors * share)))
+        n_shared_venues = max(1, int(round(n_venues * share)))
+        problems.append(ProblemInstance(
+            courses=[f'P{programme}C{i}' for i in range(n_courses)],
+            instructors=sorted(rng.choice(instructors, n_shared_instructors, replace=False).tolist()),
+            venues=sorted(rng.choice(venues, n_shared_venues, replace=False).tolist()),
+            days=days,
+            time_slots=slots,
+            session_types=DEFAULT_SESSION_TYPES,
+        ))
+    return problems
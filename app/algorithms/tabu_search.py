@@ -0,0 +1,73 @@
+import time
+
+from .base import TrajectorySolver, Budget, Solution
+from .local_search import conflicted_genes
+
+
+class TabuSearchSolver(TrajectorySolver):
+    # Each iteration samples a neighbourhood of moves on conflicted genes and
+    # takes the best one whose reverse is not tabu. A tabu move is still
+    # allowed when it beats the best solution found so far (aspiration).
+    name = 'tabu'
+    default_iterations = 2000
+    report_every = 20
+
+    def __init__(self, tenure=10, neighbourhood_size=40, focus=0.8, seed=None, progress=None):
+        super().__init__(seed, progress)
+        self.tenure = tenure
+        self.neighbourhood_size = neighbourhood_size
+        self.focus = focus
+
+    def solve(self, problem, budget: Budget, initial=None) -> Solution:
+        started = time.monotonic()
+        deadline = budget.deadline(started)
+        max_iterations = budget.max_iterations or self.default_iterations
+        target_fitness = budget.target_fitness
+        engine, current = self.start(problem, initial)
+        index = current.index
+        best = current.copy()
+        best_conflicts = index.conflicts
+        # (position, row, value) -> last iteration at which it stays forbidden
+        tabu = {}
+
+        stop_reason = 'iterations'
+        iteration = 0
+        for iteration in range(max_iterations):
+            if target_fitness is not None and best.fitness >= target_fitness:
+                stop_reason = 'target'
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                stop_reason = 'deadline'
+                break
+
+            self.report('running', iteration, best, started)
+            positions = conflicted_genes(current, index)
+            chosen, chosen_conflicts = None, None
+            for _ in range(self.neighbourhood_size):
+                # Mostly repair conflicted genes, but sometimes move any gene so
+                # that under-filled days can be topped up from elsewhere
+                focus = positions if self.rng.random() < self.focus else None
+                position, row, value = self.random_move(current, problem, focus)
+                previous = int(current.data[row, position])
+                if value == previous:
+                    continue
+                current.set_gene(position, row, value)
+                conflicts = index.conflicts
+                current.set_gene(position, row, previous)
+                if tabu.get((position, row, value), -1) >= iteration and conflicts >= best_conflicts:
+                    continue
+                if chosen is None or conflicts < chosen_conflicts:
+                    chosen, chosen_conflicts = (position, row, value, previous), conflicts
+            if chosen is None:
+                continue
+
+            position, row, value, previous = chosen
+            current.set_gene(position, row, value)
+            # Moving this gene straight back is forbidden for a while
+            tabu[(position, row, previous)] = iteration + self.tenure
+            if chosen_conflicts < best_conflicts:
+                best, best_conflicts = current.copy(), chosen_conflicts
+        else:
+            iteration = max_iterations
+
+        return self.finish(best, problem, iteration, started, stop_reason)
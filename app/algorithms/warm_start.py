@@ -0,0 +1,162 @@
+import time
+import numpy as np
+
+from ..models import TimeTable, PUBLISHED
+from .base import TrajectorySolver, Budget, Solution
+from .encoding import COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION, GENE_FIELDS
+from .genetic_algorithm import TimetableChromosome
+from .local_search import MOVE_ROWS, domain_size, conflicted_genes
+
+
+def stored_rows(timetable_main):
+    return list(TimeTable.objects.select_related('CourseName', 'Instructor', 'Venue')
+                .filter(PUBLISHED, Programme=timetable_main).order_by('pk'))
+
+
+def encode_rows(problem, rows):
+    # Stored TimeTable rows -> chromosome over the problem's current domain.
+    # Sessions of courses that are no longer offered are dropped; any other
+    # attribute that no longer maps (instructor gone, venue removed, slot
+    # outside the grid) is returned as a displaced (position, row) pair.
+    lookups = {
+        INSTRUCTOR: {instructor: i for i, instructor in enumerate(problem.instructors)},
+        VENUE: {venue: i for i, venue in enumerate(problem.venues)},
+        DAY: {day: i for i, day in enumerate(problem.days)},
+        SLOT: {start: i for i, (start, end) in enumerate(problem.time_slots)},
+    }
+    courses = {course: i for i, course in enumerate(problem.courses)}
+    session_types = {session_type: i for i, session_type in enumerate(problem.session_types)}
+
+    columns, displaced = [], []
+    for row in rows:
+        course = courses.get(row.CourseName)
+        if course is None:
+            continue
+        start = row.Timestart.strftime('%H:%M') if hasattr(row.Timestart, 'strftime') else row.Timestart
+        values = {INSTRUCTOR: row.Instructor, VENUE: row.Venue, DAY: row.Day, SLOT: start}
+        gene = [0] * GENE_FIELDS
+        gene[COURSE] = course
+        gene[SESSION] = session_types.get(row.SessionType, 0)
+        for field, value in values.items():
+            index = lookups[field].get(value)
+            if index is None:
+                displaced.append((len(columns), field))
+                index = 0
+            gene[field] = index
+        columns.append(gene)
+
+    data = np.array(columns, dtype=np.int32).T.reshape(GENE_FIELDS, len(columns))
+    return TimetableChromosome(np.ascontiguousarray(data)), displaced
+
+
+class WarmStartSolver(TrajectorySolver):
+    # Re-optimizes an existing timetable after a small change instead of
+    # generating a new one. Sessions on a withdrawn instructor or venue (or
+    # one that no longer maps onto the problem) are re-placed first, then
+    # min-conflicts moves run on conflicted sessions only. Among equally good
+    # moves the one that leaves the most sessions as they were stored wins.
+    name = 'warm_start'
+    default_iterations = 2000
+    report_every = 20
+
+    def __init__(self, unavailable_instructors=(), closed_venues=(), seed=None, progress=None):
+        super().__init__(seed, progress)
+        self.unavailable_instructors = unavailable_instructors
+        self.closed_venues = closed_venues
+        self.changed_sessions = None
+        self.dropped_sessions = None
+
+    def blocked_values(self, problem):
+        return {
+            INSTRUCTOR: {i for i, instructor in enumerate(problem.instructors)
+                         if instructor in self.unavailable_instructors},
+            VENUE: {i for i, venue in enumerate(problem.venues) if venue in self.closed_venues},
+        }
+
+    def candidates(self, problem, row, blocked):
+        return [value for value in range(domain_size(problem, row)) if value not in blocked.get(row, ())]
+
+    def solve(self, problem, budget: Budget, initial=None, displaced=()) -> Solution:
+        started = time.monotonic()
+        if initial is None:
+            rows = stored_rows(problem.timetable_main)
+            initial, displaced = encode_rows(problem, rows)
+            self.dropped_sessions = len(rows) - len(initial)
+        if not len(initial):
+            raise ValueError("No saved sessions to re-optimize")
+        deadline = budget.deadline(started)
+        max_iterations = budget.max_iterations or self.default_iterations
+        target_fitness = budget.target_fitness
+        engine, current = self.start(problem, initial)
+        index = current.index
+
+        blocked = self.blocked_values(problem)
+        displaced = list(displaced)
+        # Displaced attributes have no stored value to keep
+        baseline = initial.data.copy()
+        for position, row in displaced:
+            baseline[row, position] = -1
+        for row, values in blocked.items():
+            if values:
+                displaced += [(int(position), row)
+                              for position in np.flatnonzero(np.isin(current.data[row], list(values)))]
+        for position, row in displaced:
+            self.place(current, position, row, self.candidates(problem, row, blocked))
+
+        best = current.copy()
+        stop_reason = 'iterations'
+        iteration = 0
+        for iteration in range(max_iterations):
+            if target_fitness is not None and best.fitness >= target_fitness:
+                stop_reason = 'target'
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                stop_reason = 'deadline'
+                break
+            self.report('running', iteration, best, started)
+            conflicted = conflicted_genes(current, index)
+            if not conflicted:
+                break
+            self.step(current, conflicted[int(self.rng.integers(len(conflicted)))], baseline, problem, blocked)
+            if (index.conflicts, self.changes(current, baseline)) < (best.index.conflicts, self.changes(best, baseline)):
+                best = current.copy()
+        else:
+            iteration = max_iterations
+
+        self.changed_sessions = self.changes(best, baseline)
+        return self.finish(best, problem, iteration, started, stop_reason)
+
+    @staticmethod
+    def changes(chromosome, baseline) -> int:
+        return int((chromosome.data != baseline).any(axis=0).sum())
+
+    def place(self, chromosome, position, row, values):
+        # Put a displaced attribute on its least conflicting allowed value
+        index = chromosome.index
+        scored = []
+        for value in values:
+            chromosome.set_gene(position, row, value)
+            scored.append((index.conflicts, self.rng.random(), value))
+        chromosome.set_gene(position, row, min(scored)[2])
+
+    def step(self, chromosome, position, baseline, problem, blocked):
+        # Best single-attribute move for one session, ties going to the move
+        # that keeps (or restores) the stored value
+        index = chromosome.index
+        current = index.conflicts
+        moves = []
+        for row in MOVE_ROWS:
+            previous = int(chromosome.data[row, position])
+            for value in self.candidates(problem, row, blocked):
+                if value == previous:
+                    continue
+                chromosome.set_gene(position, row, value)
+                changed = bool((chromosome.data[:, position] != baseline[:, position]).any())
+                moves.append((index.conflicts, changed, self.rng.random(), row, value))
+            chromosome.set_gene(position, row, previous)
+        if not moves:
+            return
+        conflicts, changed, _, row, value = min(moves)
+        # Sideways moves are allowed so plateaus can be crossed
+        if conflicts <= current:
+            chromosome.set_gene(position, row, value)
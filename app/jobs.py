@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GenerationJob
+from .revisions import save_revision
+from .algorithms.base import Budget
+from .algorithms.problem import ProblemInstance
+from .algorithms.solvers import get_solver
+from .algorithms.result_cache import cached_solve
+from .algorithms.progress import ProgressThrottle, CacheProgress, read_progress
+from .algorithms.warm_start import WarmStartSolver, stored_rows, encode_rows
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = (GenerationJob.QUEUED, GenerationJob.RUNNING)
+
+
+def submit(timetable_main, solver='', warm_start=False, withdrawn_instructors=(), closed_venues=()) -> GenerationJob:
+    # Queues a generation, or attaches to the active job of an identical
+    # request (single flight). The partial unique constraint on DedupeKey
+    # admits one queued or running job per key across every web process, so
+    # of several racing requests one inserts and the rest see IntegrityError
+    # and attach. Jobs go to the in-process pool once committed; with no
+    # pool threads they wait for run_generation_jobs.
+    withdrawn_instructors, closed_venues = sorted(withdrawn_instructors), sorted(closed_venues)
+    key = dedupe_key(timetable_main, solver, warm_start, withdrawn_instructors, closed_venues)
+    for attempt in range(3):
+        job = active_job(key)
+        if job is not None:
+            GenerationJob.objects.filter(pk=job.pk).update(Requests=F('Requests') + 1)
+        else:
+            try:
+                with transaction.atomic():
+                    job = GenerationJob.objects.create(Token=uuid.uuid4().hex, Programme=timetable_main,
+                                                       Solver=solver or '', WarmStart=warm_start,
+                                                       WithdrawnInstructors=withdrawn_instructors,
+                                                       ClosedVenues=closed_venues, DedupeKey=key)
+            except IntegrityError:
+                # Another request got there first; attach to its job
+                continue
+        # Re-dispatching an attached job is harmless: only one claim succeeds
+        if job.Status == GenerationJob.QUEUED and pool_size():
+            transaction.on_commit(partial(dispatch, job.pk))
+        return job
+    raise RuntimeError(f"Could not queue a timetable job for {timetable_main}")
+
+
+def dedupe_key(timetable_main, solver='', warm_start=False, withdrawn_instructors=(), closed_venues=()) -> str:
+    # Requests with equal keys would compute the same timetable. Only the
+    # request goes in: anything read from the cache could differ between
+    # processes and split identical requests across jobs.
+    solver = solver or getattr(settings, 'TIMETABLE_SOLVER', 'genetic')
+    parts = [timetable_main.pk, solver, bool(warm_start), sorted(withdrawn_instructors), sorted(closed_venues)]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def active_job(key):
+    # The queued or running job for a key. A job left running by a worker
+    # that died is failed here so it stops absorbing new requests.
+    job = GenerationJob.objects.filter(DedupeKey=key, Status__in=ACTIVE).first()
+    stale_after = getattr(settings, 'TIMETABLE_JOB_STALE_AFTER', 600)
+    if job is not None and job.Status == GenerationJob.RUNNING and \
+            job.StartedDate < timezone.now() - timedelta(seconds=stale_after):
+        GenerationJob.objects.filter(pk=job.pk, Status=GenerationJob.RUNNING).update(
+            Status=GenerationJob.FAILED, Error='Worker stopped responding', FinishedDate=timezone.now())
+        return None
+    return job
+
+
+def claim(job_id=None):
+    # Moves one queued job to running and returns it, None when the queue is
+    # empty. The conditional UPDATE is the lock: of several workers racing
+    # for the same row exactly one sees a row count of 1.
+    queued = GenerationJob.objects.filter(Status=GenerationJob.QUEUED)
+    if job_id is not None:
+        queued = queued.filter(pk=job_id)
+    for pk in queued.order_by('RegisteredDate').values_list('pk', flat=True)[:10]:
+        claimed = GenerationJob.objects.filter(pk=pk, Status=GenerationJob.QUEUED).update(
+            Status=GenerationJob.RUNNING, StartedDate=timezone.now())
+        if claimed:
+            return GenerationJob.objects.select_related('Programme__Department', 'Programme__TimeGrid').get(pk=pk)
+    return None
+
+
+def find_job(token):
+    return GenerationJob.objects.select_related('Programme__Department', 'Revision').filter(Token=token).first()
+
+
+def job_status(job):
+    # What the polling endpoint reports: the state, the solver's latest
+    # progress event while it runs, and the result once there is one
+    status = {
+        'token': job.Token,
+        'status': job.Status,
+        'progress': read_progress(job.Token),
+    }
+    if job.Status == GenerationJob.FINISHED:
+        status['result'] = job.Result
+    elif job.Status == GenerationJob.FAILED:
+        status['error'] = job.Error
+    return status
+
+
+def run(job, problem=None):
+    # Solves a claimed job and records the outcome on it
+    progress = ProgressThrottle(CacheProgress(job.Token), getattr(settings, 'TIMETABLE_PROGRESS_INTERVAL', 0.5))
+    try:
+        if problem is None:
+            problem = ProblemInstance.from_timetable_main(job.Programme)
+        solution = solve(problem, job.Solver or None, job.WarmStart, progress,
+                         job.WithdrawnInstructors, job.ClosedVenues)
+        # Stored and made current, so later readers need no solve at all
+        job.Revision = save_revision(job.Programme, solution)
+        job.Result = solution_result(solution)
+        job.Status = GenerationJob.FINISHED
+    except Exception as e:
+        logger.exception("timetable job %s failed", job.Token)
+        job.Error = str(e)
+        job.Status = GenerationJob.FAILED
+    job.FinishedDate = timezone.now()
+    job.save(update_fields=['Status', 'Revision', 'Result', 'Error', 'FinishedDate'])
+    return job
+
+
+def solve(problem, solver=None, warm_start=False, progress=None, withdrawn_instructors=(), closed_venues=()):
+    # Latency ceiling per job, and no work past a conflict free timetable
+    budget = Budget(time_limit=getattr(settings, 'TIMETABLE_TIME_LIMIT', 20), target_fitness=1.0)
+    # Re-optimize the saved timetable with as few changes as possible when asked to
+    rows = stored_rows(problem.timetable_main) if warm_start else []
+    initial, displaced = encode_rows(problem, rows) if rows else (None, ())
+    if initial is not None and len(initial) < len(rows):
+        # Sessions of courses no longer offered cannot be carried over;
+        # generate afresh rather than publish a timetable missing sessions
+        logger.warning("saved timetable of %s no longer matches its courses; generating a new one",
+                       problem.timetable_main)
+        initial = None
+    if initial is not None:
+        # Instructors whose account was deactivated count as withdrawn too
+        unavailable = [instructor for instructor in problem.instructors
+                       if key(instructor) in withdrawn_instructors or not active(instructor)]
+        closed = [venue for venue in problem.venues if key(venue) in closed_venues]
+        return WarmStartSolver(unavailable, closed, progress=progress).solve(
+            problem, budget, initial=initial, displaced=displaced)
+    return cached_solve(get_solver(solver, progress=progress), problem, budget)
+
+
+def key(obj):
+    return getattr(obj, 'pk', obj)
+
+
+def active(instructor):
+    return getattr(getattr(instructor, 'user', None), 'is_active', True)
+
+
+def solution_result(solution):
+    # JSON-safe summary of a solution; sessions refer to rows by primary key
+    return {
+        'solver': solution.solver,
+        'fitness': solution.fitness,
+        'iterations': solution.iterations,
+        'elapsed': solution.elapsed,
+        'stop_reason': solution.stop_reason,
+        'entries': [{
+            'course': key(gene.course),
+            'instructor': key(gene.instructor),
+            'venue': key(gene.venue),
+            'day': gene.day,
+            'time_start': str(gene.time_start),
+            'time_end': str(gene.time_end),
+            'session_type': gene.session_type,
+        } for gene in solution.genes],
+    }
+
+
+def pool_size():
+    return getattr(settings, 'TIMETABLE_JOB_WORKERS', 2)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def worker_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=pool_size(), thread_name_prefix='timetable-job')
+        return _pool
+
+
+def dispatch(job_id):
+    worker_pool().submit(work, job_id)
+
+
+def work(job_id=None):
+    # Entry point of a pool thread: runs the job unless a worker process got
+    # to it first. Each thread has its own connection, closed when done.
+    try:
+        job = claim(job_id)
+        if job is not None:
+            run(job)
+    except Exception:
+        logger.exception("timetable job worker failed")
+    finally:
+        connection.close()
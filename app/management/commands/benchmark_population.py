@@ -0,0 +1,123 @@
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from app.algorithms.genetic_algorithm import GeneticTimetableAlgorithm, TimetableChromosome
+from app.algorithms.synthetic import synthetic_problems
+
+
+@contextmanager
+def counting_chromosomes(allocations):
+    # Counts TimetableChromosome objects created and the bytes of gene
+    # storage they brought with them (views into a buffer bring none)
+    init = TimetableChromosome.__init__
+
+    def counted(chromosome, data, index=None):
+        allocations['chromosomes'] += 1
+        if data.base is None:
+            allocations['gene_bytes'] += data.nbytes
+        init(chromosome, data, index)
+
+    TimetableChromosome.__init__ = counted
+    try:
+        yield
+    finally:
+        TimetableChromosome.__init__ = init
+
+
+class Command(BaseCommand):
+    help = ('Compares GA population storage: preallocated double buffers against a new '
+            'population list per generation, by chromosome and gene storage allocations '
+            'and traced memory')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--population', type=int, nargs='+', default=[50, 200, 800])
+        parser.add_argument('--generations', type=int, default=50)
+        parser.add_argument('--courses', type=int, default=8)
+        parser.add_argument('--instructors', type=int, default=6)
+        parser.add_argument('--venues', type=int, default=6)
+        parser.add_argument('--incremental', action='store_true', help='run with per-chromosome conflict indexes')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='population_benchmark.json', help="file to write, '-' for stdout")
+
+    def handle(self, *args, **options):
+        problem = synthetic_problems(n_courses=options['courses'], n_instructors=options['instructors'],
+                                     n_venues=options['venues'], seed=options['seed'])[0]
+        results = []
+        for size in options['population']:
+            for double_buffer in (True, False):
+                result = self.measure(problem, size, double_buffer, options)
+                results.append(result)
+                self.stderr.write(f"population {size}, {'buffered' if double_buffer else 'list'}: "
+                                  f"{result['chromosomes_allocated']} chromosomes allocated, "
+                                  f"{result['transient_bytes_per_generation']} transient bytes per generation, "
+                                  f"{result['memory_growth_bytes']} bytes growth")
+
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
+
+    def measure(self, problem, size, double_buffer, options):
+        # Fitness caching is off so both runs score every child. Traced memory
+        # is sampled once per generation through the progress hook: what is
+        # still held, and how far above that the generation peaked (its
+        # short-lived allocations)
+        samples, transient = [], []
+
+        def sample(event):
+            current, peak = tracemalloc.get_traced_memory()
+            if samples:
+                transient.append(peak - samples[-1])
+            samples.append(current)
+            tracemalloc.reset_peak()
+
+        ga = GeneticTimetableAlgorithm(
+            population_size=size, generations=options['generations'], incremental=options['incremental'],
+            fitness_cache_size=0, seed=options['seed'], double_buffer=double_buffer, progress=sample,
+        )
+        allocations = Counter()
+        gc.collect()
+        collections = sum(stats['collections'] for stats in gc.get_stats())
+        tracemalloc.start()
+        try:
+            with counting_chromosomes(allocations):
+                started = time.perf_counter()
+                ga.run(problem)
+                elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # Growth from the first generation on, past one-off setup costs
+        steady = samples[1:-1] or samples
+        transient = transient[1:-1] or transient
+        return {
+            'population': size,
+            'double_buffer': double_buffer,
+            'generations': ga.generations_run,
+            'elapsed': elapsed,
+            'chromosomes_allocated': allocations['chromosomes'],
+            'gene_bytes_allocated': allocations['gene_bytes'],
+            'gc_collections': sum(stats['collections'] for stats in gc.get_stats()) - collections,
+            'peak_memory_bytes': peak,
+            'memory_growth_bytes': steady[-1] - steady[0],
+            'transient_bytes_per_generation': int(np.median(transient)) if transient else None,
+            'memory_per_generation': steady,
+        }
@@ -0,0 +1,125 @@
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from app.algorithms.base import Budget
+from app.algorithms.fitness import FitnessEngine
+from app.algorithms.joint import JointScheduler
+from app.algorithms.solvers import SOLVERS, get_solver
+from app.algorithms.synthetic import synthetic_problems
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks every solver backend on synthetic instances and writes the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--programmes', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--courses', type=int, default=8)
+        parser.add_argument('--instructors', type=int, default=6)
+        parser.add_argument('--venues', type=int, default=6)
+        parser.add_argument('--days', type=int, default=5)
+        parser.add_argument('--slots', type=int, default=6)
+        parser.add_argument('--share', type=float, default=1.0)
+        parser.add_argument('--solvers', nargs='+', choices=sorted(SOLVERS), default=sorted(SOLVERS))
+        parser.add_argument('--time-limit', type=float, default=10)
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='iterations per programme for the throughput run (default: each engine\'s own)')
+        parser.add_argument('--repeats', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-memory', action='store_true',
+                            help='skip the separate traced run that measures peak memory')
+        parser.add_argument('--output', default='benchmark.json', help="file to write, '-' for stdout")
+
+    def handle(self, *args, **options):
+        results = []
+        for n_programmes in options['programmes']:
+            instance = {
+                'programmes': n_programmes,
+                'courses': options['courses'],
+                'instructors': options['instructors'],
+                'venues': options['venues'],
+                'days': options['days'],
+                'slots': options['slots'],
+                'share': options['share'],
+            }
+            for name in options['solvers']:
+                for repeat in range(options['repeats']):
+                    seed = options['seed'] + repeat
+                    result = dict(instance, solver=name, seed=seed)
+                    result.update(self.feasibility(name, instance, seed, options))
+                    result.update(self.throughput(name, instance, seed, options))
+                    if not options['no_memory']:
+                        result['peak_memory_bytes'] = self.peak_memory(name, instance, seed, options)
+                    results.append(result)
+                    self.stderr.write(f"{name} x{n_programmes}: {result['elapsed']:.3f}s, "
+                                      f"{result['final_conflicts']} conflicts")
+
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
+
+    def schedule(self, name, instance, seed, budget):
+        problems = synthetic_problems(
+            n_programmes=instance['programmes'], n_courses=instance['courses'],
+            n_instructors=instance['instructors'], n_venues=instance['venues'],
+            n_days=instance['days'], n_slots=instance['slots'], share=instance['share'], seed=seed,
+        )
+        scheduler = JointScheduler(get_solver(name, seed=seed), budget)
+        return problems, scheduler, scheduler.solve(problems)
+
+    def feasibility(self, name, instance, seed, options):
+        # Stops as soon as every programme is conflict free
+        budget = Budget(time_limit=options['time_limit'], target_fitness=1.0)
+        started = time.perf_counter()
+        problems, scheduler, solutions = self.schedule(name, instance, seed, budget)
+        elapsed = time.perf_counter() - started
+
+        # Conflicts within each programme plus double bookings between them
+        own_conflicts = sum(FitnessEngine(problem).count_conflicts(solutions[problem].chromosome)
+                            for problem in problems)
+        shared_clashes = scheduler.occupancy.clashes()
+        final_conflicts = own_conflicts + shared_clashes
+        return {
+            'elapsed': elapsed,
+            'time_to_feasible': elapsed if final_conflicts == 0 else None,
+            'final_conflicts': final_conflicts,
+            'cross_programme_clashes': shared_clashes,
+            'stop_reasons': sorted({solution.stop_reason for solution in solutions.values()}),
+        }
+
+    def throughput_budget(self, options):
+        # No target, so every engine does its full iteration budget
+        return Budget(time_limit=options['time_limit'], max_iterations=options['iterations'], target_fitness=None)
+
+    def throughput(self, name, instance, seed, options):
+        problems, scheduler, solutions = self.schedule(name, instance, seed, self.throughput_budget(options))
+        iterations = sum(solution.iterations for solution in solutions.values())
+        solve_time = sum(solution.elapsed for solution in solutions.values())
+        return {
+            'iterations': iterations,
+            'seconds_per_iteration': solve_time / iterations if iterations else None,
+        }
+
+    def peak_memory(self, name, instance, seed, options):
+        # Traced separately because tracemalloc slows the run it measures
+        tracemalloc.start()
+        try:
+            self.schedule(name, instance, seed, self.throughput_budget(options))
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app.jobs import claim, run
+
+
+class Command(BaseCommand):
+    help = 'Runs queued timetable generation jobs; start as many as the machine has cores to spare'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=1.0, help='seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=None, help='exit after this many jobs')
+        parser.add_argument('--once', action='store_true', help='exit as soon as the queue is empty')
+
+    def handle(self, *args, **options):
+        done = 0
+        while options['max_jobs'] is None or done < options['max_jobs']:
+            close_old_connections()
+            job = claim()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+            run(job)
+            done += 1
+            self.stdout.write(f"{job.Token} {job.Programme}: {job.Status}")
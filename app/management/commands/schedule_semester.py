@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.algorithms.base import Budget
+from app.algorithms.joint import JointScheduler, load_semester_problems
+from app.algorithms.solvers import SOLVERS, get_solver
+from app.revisions import save_revision
+
+
+class Command(BaseCommand):
+    help = 'Jointly schedules every programme of a semester against shared instructors and venues'
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester')
+        parser.add_argument('--solver', choices=sorted(SOLVERS), default=None)
+        parser.add_argument('--time-limit', type=float,
+                            default=getattr(settings, 'TIMETABLE_TIME_LIMIT', 20))
+        parser.add_argument('--passes', type=int, default=2)
+        parser.add_argument('--save', action='store_true',
+                            help='store each timetable as a new revision and make it current')
+
+    def handle(self, *args, **options):
+        problems = load_semester_problems(options['semester'])
+        if not problems:
+            raise CommandError(f"No programmes found for {options['semester']}")
+
+        scheduler = JointScheduler(get_solver(options['solver']),
+                                   Budget(time_limit=options['time_limit'], target_fitness=1.0),
+                                   passes=options['passes'])
+        solutions = scheduler.solve(problems)
+
+        for problem, solution in solutions.items():
+            timetable_main = problem.timetable_main
+            self.stdout.write(f"{timetable_main.Programme} year {timetable_main.YearOfStudy}: "
+                              f"fitness {solution.fitness:.3f} ({solution.stop_reason})")
+            if options['save']:
+                revision = save_revision(timetable_main, solution)
+                self.stdout.write(f"  saved as revision {revision.Number}")
+        self.stdout.write(f"Cross-programme clashes: {scheduler.occupancy.clashes()}")
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeGrid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Name', models.CharField(max_length=100, unique=True)),
+                ('Days', models.CharField(default='Monday,Tuesday,Wednesday,Thursday,Friday', help_text='Comma-separated day names', max_length=100)),
+                ('RegisteredDate', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TimeGridSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Timestart', models.TimeField()),
+                ('TimeEnd', models.TimeField()),
+                ('TimeGrid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='app.timegrid')),
+            ],
+            options={
+                'ordering': ('Timestart',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionLength',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('SessionType', models.CharField(choices=[('Tutorial', 'Tutorial'), ('Lecture', 'Lecture'), ('Lab', 'Lab'), ('Discussion', 'Discussion'), ('Presentation', 'Presentation')], max_length=100)),
+                ('Periods', models.PositiveSmallIntegerField(default=1, help_text='Consecutive periods, e.g. 2 for a double lab')),
+                ('TimeGrid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_lengths', to='app.timegrid')),
+            ],
+            options={
+                'unique_together': {('TimeGrid', 'SessionType')},
+            },
+        ),
+        migrations.AddField(
+            model_name='timetablemain',
+            name='TimeGrid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.timegrid'),
+        ),
+    ]
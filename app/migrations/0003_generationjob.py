@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_timegrid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Token', models.CharField(max_length=32, unique=True)),
+                ('Solver', models.CharField(blank=True, max_length=20)),
+                ('WarmStart', models.BooleanField(default=False)),
+                ('Status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('Result', models.JSONField(blank=True, null=True)),
+                ('Error', models.TextField(blank=True)),
+                ('RegisteredDate', models.DateTimeField(auto_now_add=True)),
+                ('StartedDate', models.DateTimeField(blank=True, null=True)),
+                ('FinishedDate', models.DateTimeField(blank=True, null=True)),
+                ('Programme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.timetablemain')),
+            ],
+            options={
+                'ordering': ('RegisteredDate',),
+                'indexes': [models.Index(fields=['Status', 'RegisteredDate'], name='app_generat_Status_081ee6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_generationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='DedupeKey',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='Requests',
+            field=models.PositiveIntegerField(default=1, help_text='Requests served by this job'),
+        ),
+        migrations.AddConstraint(
+            model_name='generationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('Status__in', ['queued', 'running'])), fields=('DedupeKey',), name='unique_active_generation'),
+        ),
+    ]
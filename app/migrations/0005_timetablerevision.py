@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_generationjob_dedupe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimetableRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Number', models.PositiveIntegerField()),
+                ('IsCurrent', models.BooleanField(default=False)),
+                ('Solver', models.CharField(blank=True, max_length=20)),
+                ('Fitness', models.FloatField(blank=True, null=True)),
+                ('RegisteredDate', models.DateTimeField(auto_now_add=True)),
+                ('Programme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='app.timetablemain')),
+            ],
+            options={
+                'ordering': ('Programme', '-Number'),
+                'unique_together': {('Programme', 'Number')},
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timetablerevision',
+            constraint=models.UniqueConstraint(condition=models.Q(('IsCurrent', True)), fields=('Programme',), name='one_current_revision'),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='Revision',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.timetablerevision'),
+        ),
+        migrations.AddField(
+            model_name='timetable',
+            name='Revision',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='app.timetablerevision'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['Revision', 'Day', 'Timestart'], name='app_timetab_Revisio_ff197b_idx'),
+        ),
+    ]
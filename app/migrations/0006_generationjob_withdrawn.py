@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_timetablerevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='WithdrawnInstructors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='ClosedVenues',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -76,11 +76,50 @@ class Instructor(models.Model):
     def __str__(self):
         return self.user.get_full_name()
 
+class TimeGrid(models.Model):
+    # The teaching week of a programme: which days, which periods (gaps
+    # between periods are breaks) and how many consecutive periods each
+    # session type takes
+    Name = models.CharField(max_length=100, unique=True)
+    Days = models.CharField(max_length=100, default='Monday,Tuesday,Wednesday,Thursday,Friday',
+                            help_text='Comma-separated day names')
+    RegisteredDate = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.Name
+
+    @property
+    def day_list(self):
+        return [day.strip() for day in self.Days.split(',') if day.strip()]
+
+class TimeGridSlot(models.Model):
+    TimeGrid = models.ForeignKey(TimeGrid, on_delete=models.CASCADE, related_name='slots')
+    Timestart = models.TimeField()
+    TimeEnd = models.TimeField()
+
+    def __str__(self):
+        return f"{self.Timestart:%H:%M}-{self.TimeEnd:%H:%M}"
+
+    class Meta:
+        ordering = ('Timestart',)
+
+class SessionLength(models.Model):
+    TimeGrid = models.ForeignKey(TimeGrid, on_delete=models.CASCADE, related_name='session_lengths')
+    SessionType = models.CharField(max_length=100, choices=SESSION)
+    Periods = models.PositiveSmallIntegerField(default=1, help_text='Consecutive periods, e.g. 2 for a double lab')
+
+    def __str__(self):
+        return f"{self.SessionType} x{self.Periods}"
+
+    class Meta:
+        unique_together = ('TimeGrid', 'SessionType')
+
 class TimeTableMain(models.Model):
     YearOfStudy = models.CharField(max_length=9)
     Programme = models.CharField(max_length=100)
     Semister = models.CharField(max_length=100)
     Department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    TimeGrid = models.ForeignKey(TimeGrid, on_delete=models.SET_NULL, null=True, blank=True)
     RegisteredDate = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -106,6 +145,28 @@ class Venue(models.Model):
         return self.Venue
  
 
+class TimetableRevision(models.Model):
+    # One generated version of a programme's timetable; its sessions are the
+    # TimeTable rows pointing at it. Students see the current revision.
+    Programme = models.ForeignKey(TimeTableMain, on_delete=models.CASCADE, related_name='revisions')
+    Number = models.PositiveIntegerField()
+    IsCurrent = models.BooleanField(default=False)
+    Solver = models.CharField(max_length=20, blank=True)
+    Fitness = models.FloatField(null=True, blank=True)
+    RegisteredDate = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.Programme} r{self.Number}"
+
+    class Meta:
+        ordering = ('Programme', '-Number')
+        unique_together = ('Programme', 'Number')
+        constraints = [
+            # Also the index the current revision is looked up by
+            models.UniqueConstraint(fields=['Programme'], condition=models.Q(IsCurrent=True),
+                                    name='one_current_revision'),
+        ]
+
 class TimeTable(models.Model):
     CourseName = models.ForeignKey(CourseName, on_delete=models.CASCADE)
     Instructor=models.ForeignKey(Instructor,on_delete=models.CASCADE)   
@@ -116,4 +177,62 @@ class TimeTable(models.Model):
     Programme=models.ForeignKey(TimeTableMain,on_delete=models.CASCADE)   
     RegisteredDate = models.DateTimeField(auto_now_add=True)
     SessionType= models.CharField(max_length=100, choices=SESSION)
-     
\ No newline at end of file
+    Revision = models.ForeignKey(TimetableRevision, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='entries')
+
+    class Meta:
+        indexes = [models.Index(fields=['Revision', 'Day', 'Timestart'])]
+
+# The sessions students see: the current revision's, plus any row entered by
+# hand, which belongs to no revision
+PUBLISHED = models.Q(Revision__IsCurrent=True) | models.Q(Revision__isnull=True)
+
+class GenerationJob(models.Model):
+    # One timetable generation requested from the index page. Workers claim
+    # queued jobs and run them off the request path; Token is also the key
+    # the solver's progress events are published under. Identical requests
+    # share the active job with their DedupeKey instead of queueing another.
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    STATUS = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FINISHED, 'Finished'),
+        (FAILED, 'Failed'),
+    ]
+
+    Token = models.CharField(max_length=32, unique=True)
+    Programme = models.ForeignKey(TimeTableMain, on_delete=models.CASCADE)
+    Solver = models.CharField(max_length=20, blank=True)
+    WarmStart = models.BooleanField(default=False)
+    # Primary keys of instructors who left and venues that closed; a warm
+    # start moves their sessions and keeps everything else where it was
+    WithdrawnInstructors = models.JSONField(default=list, blank=True)
+    ClosedVenues = models.JSONField(default=list, blank=True)
+    Status = models.CharField(max_length=10, choices=STATUS, default=QUEUED)
+    DedupeKey = models.CharField(max_length=64, null=True, blank=True)
+    Requests = models.PositiveIntegerField(default=1, help_text='Requests served by this job')
+    Result = models.JSONField(null=True, blank=True)
+    Error = models.TextField(blank=True)
+    Revision = models.ForeignKey(TimetableRevision, on_delete=models.SET_NULL, null=True, blank=True)
+    RegisteredDate = models.DateTimeField(auto_now_add=True)
+    StartedDate = models.DateTimeField(null=True, blank=True)
+    FinishedDate = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.Programme} [{self.Status}]"
+
+    @property
+    def done(self):
+        return self.Status in (self.FINISHED, self.FAILED)
+
+    class Meta:
+        ordering = ('RegisteredDate',)
+        indexes = [models.Index(fields=['Status', 'RegisteredDate'])]
+        constraints = [
+            # At most one queued or running job per key, in every process
+            models.UniqueConstraint(fields=['DedupeKey'], condition=models.Q(Status__in=['queued', 'running']),
+                                    name='unique_active_generation'),
+        ]
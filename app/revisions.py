@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import Max
+
+from .models import TimeTableMain, TimetableRevision, TimeTable
+
+
+def save_revision(timetable_main, solution, make_current=True) -> TimetableRevision:
+    # Stores a solution as the programme's next revision in one transaction:
+    # the revision row, every session in a single bulk_create and, by
+    # default, the switch to current. Readers see the old timetable or the
+    # new one, never a half-written one.
+    with transaction.atomic():
+        lock(timetable_main)
+        number = (timetable_main.revisions.aggregate(last=Max('Number'))['last'] or 0) + 1
+        revision = TimetableRevision.objects.create(Programme=timetable_main, Number=number,
+                                                    Solver=solution.solver, Fitness=solution.fitness)
+        TimeTable.objects.bulk_create(solution_rows(revision, solution.genes))
+        if make_current:
+            set_current(revision)
+    return revision
+
+
+def solution_rows(revision, genes):
+    return [
+        TimeTable(
+            CourseName=gene.course,
+            Instructor=gene.instructor,
+            Venue=gene.venue,
+            Timestart=gene.time_start,
+            TimeEnd=gene.time_end,
+            Day=gene.day,
+            Programme=revision.Programme,
+            SessionType=gene.session_type,
+            Revision=revision,
+        )
+        for gene in genes
+    ]
+
+
+def make_current(revision):
+    with transaction.atomic():
+        lock(revision.Programme)
+        set_current(revision)
+
+
+def set_current(revision):
+    # The old current revision is cleared before the new one is set, so the
+    # one_current_revision constraint holds after every statement
+    TimetableRevision.objects.filter(Programme_id=revision.Programme_id, IsCurrent=True).exclude(
+        pk=revision.pk).update(IsCurrent=False)
+    TimetableRevision.objects.filter(pk=revision.pk).update(IsCurrent=True)
+    revision.IsCurrent = True
+
+
+def lock(timetable_main):
+    # Serializes numbering and switching per programme on backends with row
+    # locks; SQLite serializes all writers anyway
+    TimeTableMain.objects.select_for_update().get(pk=timetable_main.pk)
+
+
+def current_revision(timetable_main):
+    return TimetableRevision.objects.filter(Programme=timetable_main, IsCurrent=True).first()
+
+
+def revision_entries(revision):
+    # One query over the (Revision, Day, Timestart) index
+    return list(revision.entries.select_related('CourseName', 'Instructor', 'Venue').order_by('Day', 'Timestart'))
@@ -0,0 +1,40 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CourseName, Instructor, Venue, TimeTableMain, User, TimeGrid, TimeGridSlot, SessionLength
+from .algorithms.result_cache import invalidate
+
+# The only user fields a timetable run reads
+USER_INPUTS = ('department_id', 'is_active')
+
+
+# Any change to the inputs of a timetable run makes cached results stale;
+# the time grid models count because they set days, periods and session
+# lengths
+@receiver([post_save, post_delete], sender=CourseName)
+@receiver([post_save, post_delete], sender=Instructor)
+@receiver([post_save, post_delete], sender=Venue)
+@receiver([post_save, post_delete], sender=TimeTableMain)
+@receiver(post_delete, sender=User)
+@receiver([post_save, post_delete], sender=TimeGrid)
+@receiver([post_save, post_delete], sender=TimeGridSlot)
+@receiver([post_save, post_delete], sender=SessionLength)
+def invalidate_timetable_results(sender, **kwargs):
+    invalidate()
+
+
+@receiver(pre_save, sender=User)
+def check_user_inputs(sender, instance, update_fields=None, **kwargs):
+    # An instructor's department lives on the user. Every login saves
+    # last_login, so only a change to USER_INPUTS may clear the results.
+    if update_fields is not None and not {'department', 'is_active'} & set(update_fields):
+        instance._timetable_inputs_changed = False
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*USER_INPUTS).first() if instance.pk else None
+    instance._timetable_inputs_changed = previous != {field: getattr(instance, field) for field in USER_INPUTS}
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_user_change(sender, instance, **kwargs):
+    if getattr(instance, '_timetable_inputs_changed', True):
+        invalidate()
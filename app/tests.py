@@ -1,3 +1,1166 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from collections import Counter
+from datetime import time, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from .algorithms.genetic_algorithm import (
+    GeneticTimetableAlgorithm, TimetableChromosome, PopulationBuffers,
+    COURSE, INSTRUCTOR, VENUE, DAY, SLOT, SESSION, GENE_FIELDS,
+)
+from .algorithms.fitness import FitnessEngine, ConflictIndex, FitnessCache
+from .algorithms.problem import ProblemInstance, time_grid_options
+from .algorithms.islands import IslandModel
+from .algorithms.local_search import HillClimbing, MinConflicts
+from .algorithms.base import Budget
+from .algorithms.annealing import SimulatedAnnealingSolver
+from .algorithms.tabu_search import TabuSearchSolver
+from .algorithms.solvers import SOLVERS, GeneticSolver, get_solver
+from .algorithms.joint import JointScheduler, SharedOccupancy
+from .algorithms.warm_start import WarmStartSolver, encode_rows
+from .algorithms.result_cache import cached_solve, fingerprint, version
+from .algorithms.synthetic import synthetic_problems
+from .algorithms.metrics import REGISTRY, NULL_METRICS
+from .algorithms.progress import ProgressEvent, ProgressThrottle, CacheProgress, read_progress
+from .algorithms.availability import AvailabilityIndex, GridAvailability
+from .models import Venue, SessionLength, GenerationJob, TimeTableMain, TimetableRevision, CourseName, Instructor, User
+from .revisions import solution_rows
+from .views import by_day
+from .jobs import run, solve, job_status, dedupe_key, submit, ACTIVE
+
+
+# Tests get a cache directory of their own: several clear the cache, and
+# the site's file cache holds live progress and stored results
+test_cache = None
+
+
+def setUpModule():
+    global test_cache
+    location = tempfile.mkdtemp(prefix='timetable-test-cache-')
+    test_cache = override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': location,
+    }})
+    test_cache.enable()
+
+
+def tearDownModule():
+    location = settings.CACHES['default']['LOCATION']
+    test_cache.disable()
+    shutil.rmtree(location, ignore_errors=True)
+
+
+def make_problem(n_courses=6, n_instructors=3, n_venues=3):
+    # Plain strings stand in for model instances; nothing here touches the database
+    return ProblemInstance(
+        courses=[f'C{i}' for i in range(n_courses)],
+        instructors=[f'I{i}' for i in range(n_instructors)],
+        venues=[f'V{i}' for i in range(n_venues)],
+    )
+
+
+def make_algorithm(problem=None, **kwargs):
+    ga = GeneticTimetableAlgorithm(**kwargs)
+    ga.rng = np.random.default_rng(1234)
+    ga.problem = problem or make_problem()
+    ga.prepare(ga.problem)
+    return ga
+
+
+def random_chromosome(ga, rng, n_genes=30):
+    # Unconstrained days and slots so clashes and day penalties actually occur
+    data = np.empty((GENE_FIELDS, n_genes), dtype=np.int32)
+    data[COURSE] = rng.integers(len(ga.problem.courses), size=n_genes)
+    data[INSTRUCTOR] = rng.integers(len(ga.problem.instructors), size=n_genes)
+    data[VENUE] = rng.integers(len(ga.problem.venues), size=n_genes)
+    data[DAY] = rng.integers(len(ga.problem.days), size=n_genes)
+    data[SLOT] = rng.integers(len(ga.problem.time_slots), size=n_genes)
+    data[SESSION] = rng.integers(len(ga.problem.session_types), size=n_genes)
+    return TimetableChromosome(data)
+
+
+def pairwise_fitness(ga, chromosome):
+    # The original quadratic scoring, kept as the reference semantics
+    genes = chromosome.decode(ga.problem)
+    conflicts = 0
+    for i, gene1 in enumerate(genes):
+        for gene2 in genes[i+1:]:
+            if gene1.day == gene2.day and gene1.time_start == gene2.time_start:
+                if gene1.instructor == gene2.instructor:
+                    conflicts += 1
+                if gene1.venue == gene2.venue:
+                    conflicts += 1
+                if gene1.course == gene2.course:
+                    conflicts += 1
+    day_counts = {day: 0 for day in ga.problem.days}
+    for gene in genes:
+        day_counts[gene.day] += 1
+    for count in day_counts.values():
+        if count < ga.min_lectures_per_day:
+            conflicts += (ga.min_lectures_per_day - count)
+        elif count > ga.max_lectures_per_day:
+            conflicts += (count - ga.max_lectures_per_day)
+    return 1 / (conflicts + 1)
+
+
+class FitnessEngineTests(SimpleTestCase):
+    def test_matches_pairwise_scores(self):
+        ga = make_algorithm()
+        rng = np.random.default_rng(7)
+        for _ in range(200):
+            chromosome = random_chromosome(ga, rng, n_genes=int(rng.integers(1, 60)))
+            self.assertAlmostEqual(ga.calculate_fitness(chromosome), pairwise_fitness(ga, chromosome))
+
+    def test_matches_pairwise_scores_after_mutation(self):
+        ga = make_algorithm(mutation_rate=0.5)
+        population = [ga._random_chromosome(ga.problem) for _ in range(20)]
+        for chromosome in population:
+            ga.mutate(chromosome, ga.problem)
+            self.assertAlmostEqual(ga.calculate_fitness(chromosome), pairwise_fitness(ga, chromosome))
+
+    def test_batch_evaluation_matches_single_scores(self):
+        ga = make_algorithm()
+        rng = np.random.default_rng(11)
+        population = [random_chromosome(ga, rng) for _ in range(64)]
+        expected = [ga.calculate_fitness(chromosome) for chromosome in population]
+        fitness = ga.evaluate_population(population)
+        np.testing.assert_allclose(fitness, expected)
+        self.assertEqual([c.fitness for c in population], fitness.tolist())
+
+
+class ConflictIndexTests(SimpleTestCase):
+    def test_incremental_fitness_tracks_mutation_and_crossover(self):
+        ga = make_algorithm(mutation_rate=0.3)
+        population = []
+        for _ in range(10):
+            chromosome = ga._random_chromosome(ga.problem)
+            chromosome.index = ConflictIndex.build(ga.fitness_engine, chromosome)
+            population.append(chromosome)
+        for _ in range(20):
+            parent1, parent2 = population[0], population[1]
+            child1, child2 = ga.crossover(parent1, parent2)
+            for chromosome in (child1, child2):
+                ga.mutate(chromosome, ga.problem)
+                self.assertEqual(chromosome.fitness, ga.fitness_engine.fitness(chromosome))
+            population = [child1, child2] + population[2:]
+
+    def test_lectures_per_day_follows_day_mutation(self):
+        ga = make_algorithm()
+        chromosome = ga._random_chromosome(ga.problem)
+        chromosome.index = ConflictIndex.build(ga.fitness_engine, chromosome)
+        chromosome.set_gene(0, DAY, 4)
+        expected = np.bincount(chromosome.day, minlength=5)
+        np.testing.assert_array_equal(chromosome.lectures_per_day(ga.problem), expected)
+        self.assertEqual(chromosome.fitness, ga.fitness_engine.fitness(chromosome))
+
+    def test_lectures_per_day_counts_periods(self):
+        base = make_problem()
+        problem = ProblemInstance(base.courses, base.instructors, base.venues, session_lengths=(1, 1, 2))
+        ga = make_algorithm(problem)
+        chromosome = ga._random_chromosome(problem)
+        expected = ga.fitness_engine.lectures_per_day(chromosome)
+        self.assertGreater(expected.sum(), len(chromosome))
+        np.testing.assert_array_equal(chromosome.lectures_per_day(problem), expected)
+        chromosome.index = ConflictIndex.build(ga.fitness_engine, chromosome)
+        np.testing.assert_array_equal(chromosome.lectures_per_day(problem), expected)
+
+
+class ProblemInstanceTests(SimpleTestCase):
+    def test_problem_is_immutable(self):
+        problem = make_problem()
+        with self.assertRaises(AttributeError):
+            problem.venues = ()
+        self.assertIsInstance(problem.venues, tuple)
+
+    def test_run_issues_no_queries(self):
+        # SimpleTestCase fails on any database access, so a full run over an
+        # in-memory snapshot proves the GA loop never reaches the ORM
+        problem = make_problem()
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=5)
+        best = ga.run(problem)
+        self.assertEqual(len(best.genes), len(best))
+        self.assertIn(best.genes[0].venue, problem.venues)
+        # The same snapshot is reusable for another run
+        self.assertIsNotNone(ga.run(problem).fitness)
+
+
+class IslandModelTests(SimpleTestCase):
+    def test_migration_replaces_worst_with_best_of_sources(self):
+        islands = IslandModel(n_islands=3, migration_size=1, topology='ring')
+        fitness = [[0.9, 0.5, 0.3, 0.1], [0.8, 0.4, 0.2, 0.0], [0.7, 0.6, 0.5, 0.4]]
+        islands.islands = [
+            (np.full((4, GENE_FIELDS, 2), island, dtype=np.int32), np.array(fitness[island]))
+            for island in range(3)
+        ]
+        islands.migrate()
+        population, fitness = islands.islands[1]
+        # Island 0's best arrives on island 1 and pushes out its worst individual
+        self.assertEqual(fitness.tolist(), [0.9, 0.8, 0.4, 0.2])
+        self.assertTrue((population[0] == 0).all())
+
+    def test_run_returns_best_across_islands(self):
+        problem = make_problem()
+        islands = IslandModel(n_islands=2, migration_interval=2, generations=4,
+                              max_workers=2, seed=3, population_size=8)
+        best = islands.run(problem)
+        self.assertEqual(best.fitness, max(c.fitness for c in islands.best_per_island()))
+        self.assertEqual(len(best.genes), len(best))
+
+
+class StoppingCriteriaTests(SimpleTestCase):
+    def test_stops_at_target_fitness(self):
+        # Every instructor is booked elsewhere in the first period of each
+        # day, so random seeding starts with clashes the GA has to remove
+        problem = make_problem()
+        n_slots = len(problem.time_slots)
+        first_periods = np.zeros((3, len(problem.days) * n_slots), dtype=np.int32)
+        first_periods[:, ::n_slots] = 1
+        problem = problem.with_reservations(first_periods, None)
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=50, target_fitness=1.0, seed=0)
+        self.assertLess(max(ga.fitness_engine.fitness(c) for c in ga.initialize_population(problem)), 1.0)
+        best = ga.run(problem)
+        self.assertEqual(best.fitness, 1.0)
+        self.assertEqual(ga.stop_reason, 'target')
+        self.assertGreater(ga.generations_run, 0)
+        self.assertLess(ga.generations_run, 50)
+
+    def test_deadline_and_stall_window(self):
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=50, time_limit=0)
+        ga.run(make_problem())
+        self.assertEqual(ga.stop_reason, 'deadline')
+        self.assertIsNotNone(ga.best_so_far().genes)
+
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=50, stall_generations=3)
+        ga.run(make_problem())
+        self.assertEqual(ga.stop_reason, 'stalled')
+        self.assertEqual(ga.generations_run, 3)
+
+
+class FitnessCacheTests(SimpleTestCase):
+    def test_repeated_individuals_hit_the_cache(self):
+        ga = make_algorithm(fitness_cache_size=2)
+        chromosome = ga._random_chromosome(ga.problem)
+        twin = TimetableChromosome(chromosome.data.copy())
+        ga._evaluate_unscored([chromosome])
+        ga._evaluate_unscored([twin])
+        self.assertEqual(twin.fitness, chromosome.fitness)
+        self.assertEqual((ga.fitness_cache.hits, ga.fitness_cache.misses), (1, 1))
+
+    def test_cache_is_cleared_for_each_problem(self):
+        ga = make_algorithm(fitness_cache_size=8)
+        chromosome = ga._random_chromosome(ga.problem)
+        ga._evaluate_unscored([chromosome])
+        # Every cell reserved for every instructor: the same genes now clash
+        n_cells = len(ga.problem.days) * len(ga.problem.time_slots)
+        coupled = ga.problem.with_reservations(np.ones((3, n_cells), dtype=np.int32), None)
+        ga.prepare(coupled)
+        twin = TimetableChromosome(chromosome.data.copy())
+        ga._evaluate_unscored([twin])
+        self.assertEqual(ga.fitness_cache.hits, 0)
+        self.assertLess(twin.fitness, chromosome.fitness)
+        self.assertEqual(twin.fitness, ga.fitness_engine.fitness(twin))
+
+    def test_cache_is_bounded(self):
+        cache = FitnessCache(maxsize=2)
+        for key in range(3):
+            cache.put(key, 1.0)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.get(2), 1.0)
+
+
+class GreedySeedingTests(SimpleTestCase):
+    def test_greedy_seeds_are_clash_free(self):
+        problem = make_problem(n_courses=8, n_instructors=2, n_venues=2)
+        ga = make_algorithm(problem, population_size=10, greedy_seed_ratio=0.5)
+        population = ga.initialize_population(problem)
+        for chromosome in population[:5]:
+            self.assertEqual(ga.fitness_engine.count_conflicts(chromosome), 0)
+            # Each course is taught by a single instructor all week
+            pairs = set(zip(chromosome.course.tolist(), chromosome.instructor.tolist()))
+            self.assertEqual(len(pairs), len(set(chromosome.course.tolist())))
+
+
+class LocalSearchTests(SimpleTestCase):
+    def test_repair_reduces_conflicts(self):
+        ga = make_algorithm(problem=make_problem(n_courses=10, n_instructors=6, n_venues=6))
+        rng = np.random.default_rng(5)
+        for search in (HillClimbing(max_moves=300, rng=rng), MinConflicts(max_moves=300, rng=rng)):
+            chromosome = random_chromosome(ga, rng)
+            before = ga.fitness_engine.count_conflicts(chromosome)
+            search.improve(chromosome, ga.fitness_engine, ga.problem)
+            after = ga.fitness_engine.count_conflicts(chromosome)
+            self.assertLess(after, before)
+            # The incremental index agrees with a full rescore
+            self.assertEqual(chromosome.index.conflicts, after)
+
+    def test_elite_repair_leaves_best_untouched(self):
+        problem = make_problem()
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=5, elite_size=2,
+                                       local_search=MinConflicts(max_moves=20),
+                                       local_search_on='elite')
+        best = ga.run(problem)
+        self.assertEqual(best.fitness, ga.fitness_engine.fitness(best))
+
+    def test_local_search_by_name_follows_the_seed(self):
+        runs = []
+        for _ in range(2):
+            ga = GeneticTimetableAlgorithm(population_size=10, generations=5, seed=11,
+                                           local_search='min_conflicts')
+            self.assertIsInstance(ga.local_search, MinConflicts)
+            self.assertIs(ga.local_search.rng, ga.rng)
+            runs.append(ga.run(make_problem()).data)
+        np.testing.assert_array_equal(*runs)
+        with self.assertRaises(ValueError):
+            GeneticTimetableAlgorithm(local_search='annealing')
+
+
+class SolverTests(SimpleTestCase):
+    def conflicted_start(self, problem):
+        ga = make_algorithm(problem)
+        return random_chromosome(ga, np.random.default_rng(9))
+
+    def test_every_backend_returns_a_solution(self):
+        problem = make_problem()
+        for name in SOLVERS:
+            solution = get_solver(name).solve(problem, Budget(max_iterations=5))
+            self.assertEqual(solution.solver, name)
+            self.assertEqual(len(solution.genes), len(solution.chromosome))
+
+    def test_trajectory_solvers_remove_conflicts(self):
+        problem = make_problem(n_courses=10, n_instructors=6, n_venues=6)
+        start = self.conflicted_start(problem)
+        engine = FitnessEngine(problem)
+        for solver in (SimulatedAnnealingSolver(seed=1), TabuSearchSolver(seed=1)):
+            solution = solver.solve(problem, Budget(max_iterations=2000), initial=start)
+            self.assertLess(engine.count_conflicts(solution.chromosome), engine.count_conflicts(start))
+            self.assertEqual(solution.fitness, engine.fitness(solution.chromosome))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_solver('quantum')
+
+
+class JointSchedulingTests(SimpleTestCase):
+    def test_reserved_cells_count_as_clashes_everywhere(self):
+        problem = make_problem()
+        rng = np.random.default_rng(3)
+        n_cells = len(problem.days) * len(problem.time_slots)
+        coupled = problem.with_reservations(rng.integers(0, 2, size=(3, n_cells)),
+                                            rng.integers(0, 2, size=(3, n_cells)))
+        ga = make_algorithm(coupled)
+        population = [random_chromosome(ga, rng) for _ in range(10)]
+        engine = ga.fitness_engine
+        scores = engine.evaluate_matrix(np.stack([c.data for c in population]))
+        for chromosome, score in zip(population, scores):
+            self.assertAlmostEqual(engine.fitness(chromosome), score)
+            self.assertEqual(ConflictIndex.build(engine, chromosome).conflicts, engine.count_conflicts(chromosome))
+            self.assertGreater(engine.count_conflicts(chromosome), FitnessEngine(problem).count_conflicts(chromosome))
+
+    def test_programmes_sharing_resources_do_not_double_book(self):
+        instructors = ['I0', 'I1', 'I2']
+        venues = ['V0', 'V1', 'V2', 'V3']
+        problems = [ProblemInstance([f'{name}{i}' for i in range(6)], instructors, venues)
+                    for name in ('A', 'B')]
+        scheduler = JointScheduler(SimulatedAnnealingSolver(seed=5), Budget(max_iterations=5000))
+        solutions = scheduler.solve(problems)
+        self.assertEqual(set(solutions), set(problems))
+        self.assertEqual(scheduler.occupancy.clashes(), 0)
+        for solution in solutions.values():
+            self.assertEqual(solution.fitness, 1.0)
+
+        occupancy = SharedOccupancy()
+        solution = solutions[problems[0]]
+        occupancy.book(solution)
+        occupancy.book(solution)
+        self.assertEqual(occupancy.clashes(), 2 * len(solution.genes))
+
+    def test_bookings_block_overlapping_cells_of_other_grids(self):
+        # B's periods start half an hour after A's
+        half_past = tuple((f'{hour:02}:30', f'{hour + 1:02}:30') for hour in (9, 10, 11, 14, 15, 16))
+        occupancy = SharedOccupancy()
+        gene = SimpleNamespace(instructor='I0', venue='V0', day='Monday', time_start='10:00', time_end='11:00')
+        occupancy.book(SimpleNamespace(genes=[gene]))
+        problem = ProblemInstance(['B0'], ['I0', 'I1'], ['V0'], time_slots=half_past)
+        instructors, venues = occupancy.reservations(problem)
+        # 09:30-10:30 and 10:30-11:30 on Monday, nothing else
+        self.assertEqual(np.flatnonzero(instructors[0]).tolist(), [0, 1])
+        self.assertFalse(instructors[1].any())
+        np.testing.assert_array_equal(venues[0], instructors[0])
+
+        overlapping = SimpleNamespace(instructor='I0', venue='V1', day='Monday', time_start='10:30',
+                                      time_end='11:30')
+        occupancy.book(SimpleNamespace(genes=[overlapping]))
+        self.assertEqual(occupancy.clashes(), 1)
+        self.assertEqual(occupancy.clashes(SimpleNamespace(genes=[overlapping])), 1)
+
+    def test_programmes_on_different_grids_do_not_double_book(self):
+        half_past = tuple((f'{hour:02}:30', f'{hour + 1:02}:30') for hour in (9, 10, 11, 14, 15, 16))
+        instructors, venues = [f'I{i}' for i in range(5)], [f'V{i}' for i in range(5)]
+        problems = [ProblemInstance([f'{name}{i}' for i in range(6)], instructors, venues, **options)
+                    for name, options in (('A', {}), ('B', {'time_slots': half_past}))]
+        scheduler = JointScheduler(SimulatedAnnealingSolver(seed=5), Budget(max_iterations=5000))
+        solutions = scheduler.solve(problems)
+        self.assertEqual(scheduler.occupancy.clashes(), 0)
+        for solution in solutions.values():
+            self.assertEqual(solution.fitness, 1.0)
+
+
+def stored(solution):
+    # What a saved timetable looks like when read back from TimeTable rows
+    return [SimpleNamespace(CourseName=gene.course, Instructor=gene.instructor, Venue=gene.venue,
+                            Day=gene.day, Timestart=time.fromisoformat(gene.time_start),
+                            SessionType=gene.session_type)
+            for gene in solution.genes]
+
+
+class Teacher:
+    # Hashable like an Instructor, with the account it belongs to
+    def __init__(self, pk, user):
+        self.pk, self.user = pk, user
+
+
+class WarmStartTests(SimpleTestCase):
+    def setUp(self):
+        self.problem = make_problem(n_courses=8, n_instructors=4, n_venues=4)
+        self.solution = SimulatedAnnealingSolver(seed=2).solve(self.problem, Budget(max_iterations=2000))
+        self.assertEqual(self.solution.fitness, 1.0)
+
+    def test_stored_rows_round_trip(self):
+        chromosome, displaced = encode_rows(self.problem, stored(self.solution))
+        self.assertEqual(displaced, [])
+        np.testing.assert_array_equal(chromosome.data, self.solution.chromosome.data)
+
+    def test_instructor_leaving_only_moves_their_sessions(self):
+        initial, displaced = encode_rows(self.problem, stored(self.solution))
+        solver = WarmStartSolver(unavailable_instructors=['I0'], seed=3)
+        solution = solver.solve(self.problem, Budget(max_iterations=500), initial=initial, displaced=displaced)
+        self.assertEqual(solution.fitness, 1.0)
+        self.assertNotIn('I0', [gene.instructor for gene in solution.genes])
+        self.assertEqual(solver.changed_sessions, int((initial.data[INSTRUCTOR] == 0).sum()))
+
+    def test_closed_venue_is_displaced(self):
+        problem = make_problem(n_courses=8, n_instructors=4, n_venues=3)
+        rows = stored(self.solution)
+        initial, displaced = encode_rows(problem, rows)
+        self.assertEqual(len(displaced), sum(row.Venue == 'V3' for row in rows))
+        solver = WarmStartSolver(seed=3)
+        solution = solver.solve(problem, Budget(max_iterations=500), initial=initial, displaced=displaced)
+        self.assertEqual(solution.fitness, 1.0)
+        self.assertEqual(solver.changed_sessions, len(displaced))
+
+    @override_settings(TIMETABLE_TIME_LIMIT=5)
+    def test_job_withdraws_instructors_and_closes_venues(self):
+        rows = stored(self.solution)
+        with mock.patch('app.jobs.stored_rows', return_value=rows):
+            solution = solve(self.problem, warm_start=True, withdrawn_instructors=['I0'], closed_venues=['V1'])
+        self.assertEqual(solution.solver, 'warm_start')
+        self.assertNotIn('I0', [gene.instructor for gene in solution.genes])
+        self.assertNotIn('V1', [gene.venue for gene in solution.genes])
+
+    @override_settings(TIMETABLE_TIME_LIMIT=5)
+    def test_saved_timetable_missing_courses_is_generated_afresh(self):
+        rows = stored(self.solution)
+        renamed = ProblemInstance([f'N{i}' for i in range(8)], self.problem.instructors, self.problem.venues)
+        for problem in (make_problem(n_courses=6, n_instructors=4, n_venues=4), renamed):
+            with mock.patch('app.jobs.stored_rows', return_value=rows), self.assertLogs('app.jobs', 'WARNING'):
+                solution = solve(problem, warm_start=True)
+            self.assertNotEqual(solution.solver, 'warm_start')
+            self.assertEqual({gene.course for gene in solution.genes}, set(problem.courses))
+        with self.assertRaises(ValueError):
+            WarmStartSolver().solve(renamed, Budget(), *encode_rows(renamed, rows))
+
+    @override_settings(TIMETABLE_TIME_LIMIT=5)
+    def test_deactivated_instructors_are_withdrawn(self):
+        instructors = [Teacher(f'I{i}', SimpleNamespace(is_active=i != 2)) for i in range(4)]
+        problem = ProblemInstance(self.problem.courses, instructors, self.problem.venues)
+        rows = [SimpleNamespace(**dict(vars(row), Instructor=instructors[int(row.Instructor[1:])]))
+                for row in stored(self.solution)]
+        with mock.patch('app.jobs.stored_rows', return_value=rows):
+            solution = solve(problem, warm_start=True)
+        self.assertNotIn(instructors[2], [gene.instructor for gene in solution.genes])
+
+
+class CountingSolver(SimulatedAnnealingSolver):
+    calls = 0
+
+    def solve(self, problem, budget, initial=None):
+        # Counted on the class: instance state is part of the cache key
+        CountingSolver.calls += 1
+        return super().solve(problem, budget, initial)
+
+
+class DeterminismAndResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        CountingSolver.calls = 0
+
+    def test_seeded_runs_are_reproducible(self):
+        problem = make_problem()
+        for name in SOLVERS:
+            first, second = (get_solver(name, seed=11).solve(problem, Budget(max_iterations=20, target_fitness=None))
+                             for _ in range(2))
+            np.testing.assert_array_equal(first.chromosome.data, second.chromosome.data)
+
+    def test_repeated_requests_hit_the_cache_until_inputs_change(self):
+        problem = make_problem()
+        solver = CountingSolver(seed=4)
+        budget = Budget(max_iterations=200)
+        first = cached_solve(solver, problem, budget)
+        second = cached_solve(solver, problem, budget)
+        self.assertEqual(CountingSolver.calls, 1)
+        self.assertEqual(second.stop_reason, 'cached')
+        self.assertEqual(second.fitness, first.fitness)
+        np.testing.assert_array_equal(second.chromosome.data, first.chromosome.data)
+
+        cached_solve(solver, problem, Budget(max_iterations=100))
+        self.assertEqual(CountingSolver.calls, 2)
+
+        post_save.send(sender=Venue, instance=None, created=False)
+        cached_solve(solver, problem, budget)
+        self.assertEqual(CountingSolver.calls, 3)
+
+    def test_grid_and_windows_are_part_of_the_fingerprint(self):
+        solver, budget = CountingSolver(seed=4), Budget(max_iterations=200)
+        base = make_problem()
+        variants = [
+            ProblemInstance(base.courses, base.instructors, base.venues, session_lengths=(1, 1, 2)),
+            ProblemInstance(base.courses, base.instructors, base.venues, instructor_windows=[0b1, 0, 0]),
+            ProblemInstance(base.courses, base.instructors, base.venues, venue_windows=[0, 0b1, 0]),
+        ]
+        keys = {fingerprint(problem, solver, budget) for problem in [base] + variants}
+        self.assertEqual(len(keys), 4)
+
+        before = version()
+        post_save.send(sender=SessionLength, instance=None, created=False)
+        self.assertNotEqual(version(), before)
+
+    def test_logins_keep_cached_results(self):
+        user = User(pk=5, username='lecturer', department_id=2, is_active=True)
+        before = version()
+        # What django.contrib.auth saves on every sign-in
+        for signal in (pre_save, post_save):
+            signal.send(sender=User, instance=user, created=False, update_fields=frozenset({'last_login'}))
+        self.assertEqual(version(), before)
+
+        with mock.patch.object(User, 'objects') as objects:
+            objects.filter.return_value.values.return_value.first.return_value = {'department_id': 2,
+                                                                                  'is_active': True}
+            for signal in (pre_save, post_save):
+                signal.send(sender=User, instance=user, created=False, update_fields=None)
+            self.assertEqual(version(), before)
+            user.is_active = False
+            for signal in (pre_save, post_save):
+                signal.send(sender=User, instance=user, created=False, update_fields=None)
+        self.assertNotEqual(version(), before)
+
+    def test_runs_cut_off_by_the_clock_are_not_cached(self):
+        problem = make_problem()
+        solver = CountingSolver(seed=4)
+        deadline = SimpleNamespace(fitness=0.5, stop_reason='deadline')
+        with mock.patch.object(SimulatedAnnealingSolver, 'solve', return_value=deadline):
+            for _ in range(2):
+                cached_solve(solver, problem, Budget(time_limit=5))
+        self.assertEqual(CountingSolver.calls, 2)
+
+        budget = Budget(time_limit=5, target_fitness=1.0)
+        first = cached_solve(solver, problem, budget)
+        self.assertEqual(first.stop_reason, 'target')
+        self.assertEqual(cached_solve(solver, problem, budget).stop_reason, 'cached')
+        self.assertEqual(CountingSolver.calls, 3)
+
+    def test_unseeded_solvers_are_not_cached(self):
+        solver = CountingSolver()
+        for _ in range(2):
+            cached_solve(solver, make_problem(), Budget(max_iterations=50))
+        self.assertEqual(CountingSolver.calls, 2)
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_synthetic_instances_follow_parameters(self):
+        problems = synthetic_problems(n_programmes=3, n_courses=5, n_instructors=10, n_venues=4,
+                                      n_days=6, n_slots=8, share=0.5, seed=1)
+        self.assertEqual(len(problems), 3)
+        for problem in problems:
+            self.assertEqual(len(problem.courses), 5)
+            self.assertEqual(len(problem.instructors), 5)
+            self.assertEqual(len(problem.venues), 2)
+            self.assertEqual(problem.days[-1], 'Saturday')
+            self.assertEqual(problem.time_slots[-1], ('15:00', '16:00'))
+        self.assertEqual(len({course for problem in problems for course in problem.courses}), 15)
+
+    def test_benchmark_writes_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('benchmark_solvers', '--programmes', '1', '2', '--iterations', '5',
+                         '--time-limit', '5', '--output', output, stdout=StringIO(), stderr=StringIO())
+            with open(output) as handle:
+                results = json.load(handle)['results']
+        self.assertEqual(len(results), 2 * len(SOLVERS))
+        for result in results:
+            for field in ('seconds_per_iteration', 'time_to_feasible', 'final_conflicts', 'peak_memory_bytes'):
+                self.assertIn(field, result)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_run_reports_per_phase_metrics(self):
+        problem = make_problem()
+        solution = GeneticSolver(population_size=10, seed=1, metrics=True).solve(
+            problem, Budget(max_iterations=5, target_fitness=None))
+        metrics = solution.metrics.as_dict()
+        self.assertEqual(metrics['generations'], 5)
+        self.assertEqual(metrics['queries'], 0)
+        self.assertGreater(metrics['evaluations'], 0)
+        self.assertGreater(metrics['evaluations_per_second'], 0)
+        self.assertEqual(set(metrics['phases']), {'initialize', 'evaluate', 'select', 'crossover', 'mutate'})
+        self.assertEqual(metrics['phases']['select']['calls'], 5)
+        self.assertEqual(metrics['phases']['mutate']['calls'], 5 * (10 - 2))
+
+    def test_problem_load_queries_are_counted(self):
+        problem = make_problem()
+
+        def load(*args):
+            # Stands in for the ORM: each query passes the installed wrappers
+            for query in range(3):
+                for wrapper in connection.execute_wrappers:
+                    wrapper(lambda *params: None, 'SELECT 1', None, False, {})
+            return problem
+
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=2, metrics=True)
+        with mock.patch.object(ProblemInstance, 'load', side_effect=load) as loader:
+            ga.evolve('BSc CS', '1', '1')
+        loader.assert_called_once_with('BSc CS', '1', '1')
+        metrics = ga.metrics.as_dict()
+        self.assertEqual(metrics['queries'], 3)
+        self.assertEqual(metrics['phases']['load']['calls'], 1)
+        # A snapshot passed in is not loaded again
+        ga.evolve('BSc CS', '1', '1', problem=problem)
+        self.assertEqual(ga.metrics.as_dict()['queries'], 0)
+        self.assertNotIn('load', ga.metrics.as_dict()['phases'])
+
+    def test_disabled_metrics_are_a_no_op(self):
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=3, seed=1)
+        ga.run(make_problem())
+        self.assertIs(ga.metrics, NULL_METRICS)
+        solution = GeneticSolver(population_size=10, seed=1).solve(make_problem(), Budget(max_iterations=3))
+        self.assertIsNone(solution.metrics)
+
+    def test_prometheus_endpoint(self):
+        REGISTRY.reset()
+        GeneticSolver(population_size=10, seed=1, metrics=True).solve(
+            make_problem(), Budget(max_iterations=2, target_fitness=None))
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+        with override_settings(TIMETABLE_METRICS_ENDPOINT=True):
+            response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('timetable_runs_total 1', body)
+        self.assertIn('timetable_phase_calls_total{phase="select"} 2', body)
+
+
+class ProgressTests(SimpleTestCase):
+    def test_ga_reports_each_generation(self):
+        events = []
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=4, seed=1, progress=events.append)
+        ga.run(make_problem())
+        self.assertEqual([event.stage for event in events], ['running'] * 4 + ['finished'])
+        self.assertEqual([event.generation for event in events], [0, 1, 2, 3, 4])
+        self.assertEqual(events[-1].stop_reason, 'generations')
+        self.assertEqual(events[-1].as_dict()['conflicts'], int(round(1 / ga.best.fitness - 1)))
+
+    def test_throttle_keeps_the_final_event(self):
+        events = []
+        throttle = ProgressThrottle(events.append, min_interval=60)
+        for generation in range(10):
+            throttle(ProgressEvent('running', generation, 0.5, 0.0))
+        throttle(ProgressEvent('finished', 10, 1.0, 0.0))
+        self.assertEqual([event.generation for event in events], [0, 10])
+
+    def test_trajectory_solvers_report_progress(self):
+        events = []
+        SimulatedAnnealingSolver(seed=1, progress=events.append).solve(
+            make_problem(), Budget(max_iterations=500, target_fitness=None))
+        self.assertEqual([event.generation for event in events], [0, 200, 400, 500])
+        self.assertEqual(events[-1].solver, 'annealing')
+
+    def test_progress_is_visible_to_other_processes(self):
+        # What a run_generation_jobs process publishes, a web worker reads
+        token = 'ef' * 16
+        script = ('import django; django.setup(); '
+                  'from django.test.utils import override_settings; '
+                  f'override_settings(CACHES={settings.CACHES!r}).enable(); '
+                  'from app.algorithms.progress import CacheProgress, ProgressEvent; '
+                  f'CacheProgress("{token}")(ProgressEvent("running", 3, 0.5, 1.0))')
+        subprocess.run([sys.executable, '-c', script], check=True, cwd=settings.BASE_DIR,
+                       env=dict(os.environ, DJANGO_SETTINGS_MODULE='project.settings'))
+        self.assertEqual(read_progress(token)['generation'], 3)
+
+    def test_stream_sends_cached_events_until_finished(self):
+        cache.clear()
+        token = 'ab' * 16
+        CacheProgress(token)(ProgressEvent('finished', 7, 1.0, 1.5, 'genetic', 'target'))
+        response = self.client.get(f'/progress/{token}/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('data: '))
+        self.assertEqual(json.loads(body[len('data: '):])['generation'], 7)
+        self.assertEqual(self.client.get('/progress/not-a-token/').status_code, 404)
+
+
+class FakeJob(SimpleNamespace):
+    # A GenerationJob stand-in that records saves instead of writing them
+    def __init__(self, **kwargs):
+        defaults = dict(Token='cd' * 16, Programme=None, Solver='', WarmStart=False,
+                        WithdrawnInstructors=[], ClosedVenues=[], Status=GenerationJob.RUNNING, Result=None,
+                        Error='', FinishedDate=None)
+        super().__init__(**dict(defaults, **kwargs))
+        self.saved = []
+
+    def save(self, update_fields=None):
+        self.saved.append(update_fields)
+
+
+class GenerationJobTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(TIMETABLE_TIME_LIMIT=5)
+    def test_run_records_result_and_progress(self):
+        job = FakeJob(Solver='annealing')
+        with mock.patch('app.jobs.save_revision', return_value='revision') as save_revision:
+            run(job, make_problem())
+        self.assertEqual(job.Status, GenerationJob.FINISHED)
+        self.assertEqual(job.saved, [['Status', 'Revision', 'Result', 'Error', 'FinishedDate']])
+        self.assertEqual(job.Revision, 'revision')
+        self.assertEqual(save_revision.call_args.args[1].fitness, job.Result['fitness'])
+        self.assertEqual(job.Result['fitness'], 1.0)
+        self.assertEqual({entry['course'] for entry in job.Result['entries']}, {f'C{i}' for i in range(6)})
+        self.assertEqual(json.loads(json.dumps(job.Result)), job.Result)
+        status = job_status(job)
+        self.assertEqual(status['progress']['stage'], 'finished')
+        self.assertIs(status['result'], job.Result)
+
+    def test_failures_are_recorded_on_the_job(self):
+        job = FakeJob(Solver='nonexistent')
+        with self.assertLogs('app.jobs', 'ERROR'):
+            run(job, make_problem())
+        self.assertEqual(job.Status, GenerationJob.FAILED)
+        self.assertIn('Unknown timetable solver', job_status(job)['error'])
+        self.assertNotIn('result', job_status(job))
+
+    def test_identical_requests_share_a_dedupe_key(self):
+        main = SimpleNamespace(pk=1)
+        key = dedupe_key(main)
+        self.assertEqual(key, dedupe_key(main, 'genetic'))
+        self.assertNotEqual(key, dedupe_key(main, 'tabu'))
+        self.assertNotEqual(key, dedupe_key(main, warm_start=True))
+        self.assertNotEqual(key, dedupe_key(main, withdrawn_instructors=[3]))
+        self.assertEqual(dedupe_key(main, closed_venues=['LT1', 'LT2']),
+                         dedupe_key(main, closed_venues=['LT2', 'LT1']))
+        self.assertNotEqual(key, dedupe_key(SimpleNamespace(pk=2)))
+        # Nothing process-local goes into the key
+        post_save.send(sender=Venue, instance=None, created=False)
+        self.assertEqual(key, dedupe_key(main))
+
+    def single_flight(self, active):
+        # submit() against a mocked manager: filter().first() yields the
+        # active job for the key on each successive lookup
+        objects = mock.MagicMock()
+        objects.filter.return_value.first.side_effect = active
+        patches = [mock.patch.object(GenerationJob, 'objects', objects),
+                   mock.patch('app.jobs.transaction'),
+                   mock.patch('app.jobs.pool_size', return_value=0)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return objects
+
+    def test_first_request_inserts_a_job(self):
+        objects = self.single_flight([None])
+        main = SimpleNamespace(pk=1)
+        job = submit(main, 'tabu')
+        self.assertIs(job, objects.create.return_value)
+        create = objects.create.call_args.kwargs
+        self.assertEqual(create['DedupeKey'], dedupe_key(main, 'tabu'))
+        self.assertEqual((create['Programme'], create['Solver']), (main, 'tabu'))
+        objects.filter.assert_any_call(DedupeKey=create['DedupeKey'], Status__in=ACTIVE)
+
+    def test_losing_the_insert_race_attaches_to_the_winner(self):
+        winner = FakeJob(pk=7, Status=GenerationJob.QUEUED)
+        objects = self.single_flight([None, winner])
+        objects.create.side_effect = IntegrityError('unique_active_generation')
+        self.assertIs(submit(SimpleNamespace(pk=1)), winner)
+        self.assertEqual(objects.create.call_count, 1)
+        objects.filter.assert_called_with(pk=7)
+        objects.filter.return_value.update.assert_called_once()
+        self.assertEqual(str(objects.filter.return_value.update.call_args.kwargs['Requests']),
+                         str(F('Requests') + 1))
+
+    @override_settings(TIMETABLE_JOB_STALE_AFTER=60)
+    def test_stale_running_job_is_failed_and_replaced(self):
+        lost = FakeJob(pk=3, Status=GenerationJob.RUNNING, StartedDate=timezone.now() - timedelta(minutes=5))
+        objects = self.single_flight([lost])
+        job = submit(SimpleNamespace(pk=1))
+        self.assertIs(job, objects.create.return_value)
+        objects.filter.assert_any_call(pk=3, Status=GenerationJob.RUNNING)
+        self.assertEqual(objects.filter.return_value.update.call_args.kwargs['Status'], GenerationJob.FAILED)
+
+    def test_fresh_running_job_is_joined(self):
+        running = FakeJob(pk=4, Status=GenerationJob.RUNNING, StartedDate=timezone.now())
+        objects = self.single_flight([running])
+        self.assertIs(submit(SimpleNamespace(pk=1)), running)
+        objects.create.assert_not_called()
+
+    def test_polling_endpoint(self):
+        job = FakeJob(Status=GenerationJob.QUEUED)
+        with mock.patch('app.views.find_job', return_value=job):
+            response = self.client.get(f'/jobs/{job.Token}/')
+        self.assertEqual(response.json(), {'token': job.Token, 'status': 'queued', 'progress': None})
+        with mock.patch('app.views.find_job', return_value=None):
+            self.assertEqual(self.client.get(f'/jobs/{job.Token}/').status_code, 404)
+        self.assertEqual(self.client.get('/jobs/not-a-token/').status_code, 404)
+
+
+class RevisionTests(SimpleTestCase):
+    def test_solution_rows_belong_to_the_revision(self):
+        main = TimeTableMain(Programme='BSc CS', Semister='1', YearOfStudy='1')
+        revision = TimetableRevision(Programme=main, Number=3)
+        course, instructor, venue = CourseName(CourseCode='CS101', Course='CS1'), Instructor(), Venue(Venue='LT1')
+        genes = [SimpleNamespace(course=course, instructor=instructor, venue=venue, day=day,
+                                 time_start='08:00', time_end='10:00', session_type='Lab')
+                 for day in ('Tuesday', 'Monday')]
+        rows = solution_rows(revision, genes)
+        self.assertEqual([row.Day for row in rows], ['Tuesday', 'Monday'])
+        for row in rows:
+            self.assertIs(row.Revision, revision)
+            self.assertIs(row.Programme, main)
+            self.assertIs(row.CourseName, course)
+            self.assertEqual((row.Timestart, row.TimeEnd, row.SessionType), ('08:00', '10:00', 'Lab'))
+
+    def test_entries_are_grouped_in_week_order(self):
+        entries = [SimpleNamespace(Day=day) for day in ('Friday', 'Monday', 'Friday', 'Wednesday')]
+        grouped = by_day(entries)
+        self.assertEqual(list(grouped), ['Monday', 'Wednesday', 'Friday'])
+        self.assertEqual(len(grouped['Friday']), 2)
+
+
+class AvailabilityTests(SimpleTestCase):
+    def windowed_problem(self):
+        # I0 never teaches on Monday, V1 is closed for the first slot of every day
+        base = make_problem()
+        monday = base.cell_mask((0, slot) for slot in range(len(base.time_slots)))
+        first_slots = base.cell_mask((day, 0) for day in range(len(base.days)))
+        return ProblemInstance(base.courses, base.instructors, base.venues,
+                               instructor_windows=[monday, 0, 0], venue_windows=[0, first_slots, 0])
+
+    def test_set_clear_test_and_first_free(self):
+        index = AvailabilityIndex(2, 10, blocked=[0b11, 0])
+        self.assertTrue(index.test(0, 1))
+        self.assertEqual(index.first_free(0), 2)
+        index.set(0, 2)
+        index.set(0, 3)
+        self.assertEqual(index.first_free(0), 4)
+        self.assertEqual(index.first_free(0, start=8), 8)
+        self.assertEqual(index.first_free(0, within=0b1100), -1)
+        index.clear(0, 3)
+        self.assertFalse(index.test(0, 3))
+        self.assertEqual(index.first_free(0), 3)
+        index.clear(0, 1)
+        self.assertTrue(index.test(0, 1))
+
+    def test_windows_are_never_sampled(self):
+        problem = self.windowed_problem()
+        ga = make_algorithm(problem, population_size=20, mutation_rate=0.5)
+        population = ga.initialize_population(problem)
+        for _ in range(10):
+            for chromosome in population:
+                ga.mutate(chromosome, problem)
+        for chromosome in population:
+            data = chromosome.data
+            self.assertFalse(((data[INSTRUCTOR] == 0) & (data[DAY] == 0)).any())
+            self.assertFalse(((data[VENUE] == 1) & (data[SLOT] == 0)).any())
+
+    def test_unconstrained_mutation_skips_the_occupancy_rebuild(self):
+        problem = make_problem()
+        ga = make_algorithm(problem, population_size=10, mutation_rate=0.5)
+        population = ga.initialize_population(problem)
+        for chromosome in population:
+            chromosome.index = ConflictIndex.build(ga.fitness_engine, chromosome)
+        with mock.patch.object(GridAvailability, 'build') as build:
+            for chromosome in population:
+                ga.mutate(chromosome, problem)
+        build.assert_not_called()
+        for chromosome in population:
+            self.assertEqual(chromosome.index.conflicts, ga.fitness_engine.count_conflicts(chromosome))
+
+    def test_window_placements_count_as_clashes(self):
+        problem = self.windowed_problem()
+        ga = make_algorithm(problem)
+        engine = ga.fitness_engine
+        rng = np.random.default_rng(5)
+        population = [random_chromosome(ga, rng) for _ in range(10)]
+        scores = engine.evaluate_matrix(np.stack([c.data for c in population]))
+        unwindowed = FitnessEngine(make_problem())
+        for chromosome, score in zip(population, scores):
+            data = chromosome.data
+            in_windows = int(((data[INSTRUCTOR] == 0) & (data[DAY] == 0)).sum()
+                             + ((data[VENUE] == 1) & (data[SLOT] == 0)).sum())
+            self.assertEqual(engine.count_conflicts(chromosome), unwindowed.count_conflicts(chromosome) + in_windows)
+            self.assertEqual(ConflictIndex.build(engine, chromosome).conflicts, engine.count_conflicts(chromosome))
+            self.assertAlmostEqual(engine.fitness(chromosome), score)
+
+    def test_free_resources_per_cell(self):
+        problem = self.windowed_problem()
+        availability = GridAvailability.for_problem(problem).build(np.array(
+            [[0], [1], [0], [2], [3], [0]], dtype=np.int32))
+        cell = 2 * len(problem.time_slots) + 3
+        self.assertEqual(availability.cell_instructors.free(cell), 0b101)
+        self.assertEqual(availability.sample_venue(cell, 0), 1)
+        self.assertEqual(availability.allowed_values(0, 1, 0, 0, 0, DAY), [])
+        self.assertEqual(availability.allowed_values(0, 0, 1, 0, 0, INSTRUCTOR), [0, 1, 2])
+
+
+    def test_slot_moves_are_uniform_over_free_slots(self):
+        problem = make_problem()
+        n_slots = len(problem.time_slots)
+        availability = GridAvailability.for_problem(problem)
+        # Course 0 already sits in slot 1 on Wednesday, so five slots are free
+        availability.add(0, 1, 1, 2 * n_slots + 1)
+        draws = np.random.default_rng(3).integers(1 << 30, size=5000).tolist()
+        counts = Counter(availability.sample_value(0, 0, 0, 2, 4, 0, SLOT, draw) for draw in draws)
+        self.assertEqual(set(counts), set(range(n_slots)) - {1})
+        for count in counts.values():
+            self.assertAlmostEqual(count / len(draws), 1 / 5, delta=0.03)
+
+class TimeGridTests(SimpleTestCase):
+    # Lectures and tutorials take one period, labs a double period
+    def lab_problem(self, **kwargs):
+        return ProblemInstance(
+            courses=[f'C{i}' for i in range(6)],
+            instructors=[f'I{i}' for i in range(3)],
+            venues=[f'V{i}' for i in range(3)],
+            session_lengths=(1, 1, 2),
+            **kwargs
+        )
+
+    def test_runs_stop_at_breaks(self):
+        problem = self.lab_problem()
+        # 10-13 and 14-17 with lunch in between
+        self.assertEqual(problem.slot_runs, (3, 2, 1, 3, 2, 1))
+        with self.assertRaises(ValueError):
+            ProblemInstance(['C'], ['I'], ['V'], time_slots=[('09:00', '10:00'), ('11:00', '12:00')],
+                            session_lengths=(1, 1, 2))
+
+    def test_time_grid_options(self):
+        grid = SimpleNamespace(
+            day_list=['Monday', 'Wednesday'],
+            slots=SimpleNamespace(all=lambda: [SimpleNamespace(Timestart=time(9), TimeEnd=time(10)),
+                                               SimpleNamespace(Timestart=time(10), TimeEnd=time(11))]),
+            session_lengths=SimpleNamespace(all=lambda: [SimpleNamespace(SessionType='Lab', Periods=2)]),
+        )
+        options = time_grid_options(grid)
+        self.assertEqual(options['days'], ('Monday', 'Wednesday'))
+        self.assertEqual(options['time_slots'], (('09:00', '10:00'), ('10:00', '11:00')))
+        self.assertEqual(options['session_lengths'], (1, 1, 2))
+        self.assertEqual(time_grid_options(None), {})
+
+    def test_double_periods_clash_on_every_covered_slot(self):
+        problem = self.lab_problem()
+        engine = FitnessEngine(problem, min_lectures_per_day=0)
+        # Lab of I0 at 10:00-12:00, lecture of I0 at 11:00: one clash
+        data = np.array([[0, 1], [0, 0], [0, 1], [0, 0], [0, 1], [2, 0]], dtype=np.int32)
+        chromosome = TimetableChromosome(data)
+        self.assertEqual(engine.count_conflicts(chromosome), 1)
+        # Lab starting at 12:00 would run into lunch
+        data[SLOT, 0], data[SLOT, 1] = 2, 0
+        self.assertEqual(engine.count_conflicts(chromosome), 1)
+        data[SLOT, 0] = 3
+        self.assertEqual(engine.count_conflicts(chromosome), 0)
+        genes = chromosome.decode(problem)
+        self.assertEqual((genes[0].time_start, genes[0].time_end), ('14:00', '16:00'))
+
+    def test_engine_batch_and_index_agree(self):
+        problem = self.lab_problem(instructor_windows=[0b11, 0, 0])
+        ga = make_algorithm(problem)
+        engine = ga.fitness_engine
+        rng = np.random.default_rng(3)
+        population = [random_chromosome(ga, rng) for _ in range(10)]
+        scores = engine.evaluate_matrix(np.stack([c.data for c in population]))
+        for chromosome, score in zip(population, scores):
+            chromosome.index = ConflictIndex.build(engine, chromosome)
+            self.assertEqual(chromosome.index.conflicts, engine.count_conflicts(chromosome))
+            self.assertAlmostEqual(engine.fitness(chromosome), score)
+            for _ in range(20):
+                row = int(rng.integers(GENE_FIELDS))
+                value = int(rng.integers(3))
+                chromosome.set_gene(int(rng.integers(len(chromosome))), row, value)
+            self.assertEqual(chromosome.index.conflicts, engine.count_conflicts(chromosome))
+
+    def test_population_shares_the_session_plan(self):
+        problem = self.lab_problem()
+        ga = make_algorithm(problem, population_size=20, greedy_seed_ratio=0.5, mutation_rate=0.3)
+        population = ga.initialize_population(problem)
+        for chromosome in population:
+            ga.mutate(chromosome, problem)
+        sessions = population[0].session_type
+        self.assertIn(2, sessions.tolist())
+        engine = ga.fitness_engine
+        for chromosome in population:
+            np.testing.assert_array_equal(chromosome.session_type, sessions)
+            self.assertFalse(engine.invalid[chromosome.session_type, chromosome.slot].any())
+
+    def test_grids_with_more_slots_keep_one_gene_count(self):
+        slots = tuple((f'{hour:02d}:00', f'{hour + 1:02d}:00') for hour in range(8, 16))
+        problem = ProblemInstance([f'C{i}' for i in range(6)], [f'I{i}' for i in range(3)],
+                                  [f'V{i}' for i in range(3)], time_slots=slots)
+        for double_buffer in (True, False):
+            for crossover_mode in ('day', 'point'):
+                ga = GeneticTimetableAlgorithm(population_size=12, generations=3, seed=1, greedy_seed_ratio=0.5,
+                                               double_buffer=double_buffer, crossover_mode=crossover_mode)
+                population = ga.initialize_population(problem)
+                self.assertEqual({len(chromosome) for chromosome in population}, {6 * 5})
+                self.assertEqual(len(ga.run(problem)), 6 * 5)
+
+    def test_short_grids_can_be_conflict_free(self):
+        slots = tuple((f'{hour:02d}:00', f'{hour + 1:02d}:00') for hour in range(8, 13))
+        problem = ProblemInstance([f'C{i}' for i in range(6)], [f'I{i}' for i in range(3)],
+                                  [f'V{i}' for i in range(3)], time_slots=slots)
+        self.assertEqual(FitnessEngine(problem).min_lectures_per_day, 5)
+        for name in SOLVERS:
+            solution = get_solver(name, seed=0).solve(problem, Budget(time_limit=5, target_fitness=1.0))
+            self.assertEqual(solution.fitness, 1.0, name)
+            self.assertEqual(solution.stop_reason, 'target', name)
+
+    def test_solvers_place_labs_as_double_periods(self):
+        problem = self.lab_problem()
+        for name in SOLVERS:
+            solution = get_solver(name, seed=0).solve(problem, Budget(time_limit=5, target_fitness=1.0))
+            self.assertEqual(solution.fitness, 1.0, name)
+            labs = [gene for gene in solution.genes if gene.session_type == 'Lab']
+            self.assertTrue(labs)
+            for gene in labs:
+                self.assertIn((gene.time_start, gene.time_end), {('10:00', '12:00'), ('11:00', '13:00'),
+                                                                 ('14:00', '16:00'), ('15:00', '17:00')})
+
+
+class PopulationBufferTests(SimpleTestCase):
+    def test_buffered_and_list_generations_match(self):
+        problem = make_problem(n_instructors=2, n_venues=2)
+        for kwargs in ({}, {'incremental': True}, {'population_size': 21}):
+            runs = []
+            for double_buffer in (True, False):
+                ga = GeneticTimetableAlgorithm(generations=15, seed=4, double_buffer=double_buffer, **kwargs)
+                runs.append(ga.run(problem))
+            self.assertEqual(runs[0].fitness, runs[1].fitness)
+            np.testing.assert_array_equal(runs[0].data, runs[1].data)
+
+    def test_generations_reuse_the_two_buffers(self):
+        problem = make_problem()
+        ga = make_algorithm(problem, population_size=10, incremental=True)
+        population = ga.initialize_population(problem)
+        population = ga.next_generation(population, problem)
+        buffers = ga.buffers
+        self.assertIsInstance(buffers, PopulationBuffers)
+        matrices = [id(matrix) for matrix in buffers.matrices]
+        for _ in range(5):
+            previous = {id(chromosome) for chromosome in population}
+            population = ga.next_generation(population, problem)
+            self.assertIs(ga.buffers, buffers)
+            self.assertTrue(previous.isdisjoint(id(chromosome) for chromosome in population))
+            for chromosome in population:
+                self.assertIn(id(chromosome.data.base), matrices)
+                self.assertEqual(chromosome.fitness, ga.fitness_engine.fitness(chromosome))
+
+    def test_best_is_not_overwritten_by_later_generations(self):
+        ga = GeneticTimetableAlgorithm(population_size=10, generations=5, seed=2)
+        best = ga.run(make_problem())
+        self.assertIsNone(best.data.base)
+        self.assertEqual(best.fitness, FitnessEngine(make_problem()).fitness(best))
+
+    def test_benchmark_counts_allocations(self):
+        output = StringIO()
+        call_command('benchmark_population', '--population', '10', '--generations', '4',
+                     '--output', '-', stdout=output, stderr=StringIO())
+        buffered, listed = json.loads(output.getvalue())['results']
+        self.assertTrue(buffered['double_buffer'])
+        self.assertLess(buffered['chromosomes_allocated'], listed['chromosomes_allocated'])
+
+
+class BatchedOperatorTests(SimpleTestCase):
+    def test_tournament_entrants_are_distinct(self):
+        ga = make_algorithm()
+        fitness = np.array([0.2, 0.9, 0.1, 0.5, 0.3])
+        # Five distinct entrants out of five: every tournament sees the best
+        ga.tournament_size = 5
+        self.assertEqual(ga.tournament(fitness).tolist(), [1] * 5)
+        ga.tournament_size = 3
+        winners = ga.tournament(np.linspace(0, 1, 40))
+        # The two worst can never beat two other distinct entrants
+        self.assertTrue((winners >= 2).all())
+
+    def test_masked_crossover_matches_single_pairs(self):
+        problem = make_problem()
+        ga = make_algorithm(problem, population_size=9, incremental=True)
+        population = ga.initialize_population(problem)
+        ga.buffers = PopulationBuffers.holding(population, ga.population_size)
+        population = ga.buffers.current
+        parents = ga.tournament(np.array([chromosome.fitness for chromosome in population]))
+        first, second, masks = ga.pair_parents(parents, 7, ga.buffers.matrix[:, DAY])
+        children = ga.buffers.back[2:]
+        ga.crossover_population(population, first, second, masks, children)
+        for position, child in enumerate(children):
+            pair, offset = divmod(position, 2)
+            expected = ga._crossover_masked(population[first[pair]], population[second[pair]], masks[pair])[offset]
+            np.testing.assert_array_equal(child.data, expected.data)
+            self.assertEqual(child.fitness, ga.fitness_engine.fitness(child))
+
+    def test_day_crossover_swaps_whole_days(self):
+        # Labs take two periods, so plan days hold unequal numbers of genes,
+        # and mutation moves genes between days on top of that
+        problem = ProblemInstance([f'C{i}' for i in range(6)], [f'I{i}' for i in range(3)],
+                                  [f'V{i}' for i in range(3)], session_lengths=(1, 1, 2))
+        ga = make_algorithm(problem, population_size=20, mutation_rate=0.3)
+        population = ga.initialize_population(problem)
+        self.assertGreater(len({int(count) for count in np.bincount(population[0].day)}), 1)
+        for chromosome in population:
+            for _ in range(5):
+                ga.mutate(chromosome, problem)
+        days = np.stack([chromosome.day for chromosome in population])
+        for pair_days, mask in zip(days, ga.day_masks(days)):
+            # Each day of the first parent goes to one child whole
+            taken = [set(mask[pair_days == day].tolist()) for day in np.unique(pair_days).tolist()]
+            self.assertTrue(all(len(values) == 1 for values in taken))
+            self.assertEqual(set().union(*taken), {True, False})
+
+    def test_children_never_alias_parents_or_best(self):
+        problem = make_problem()
+        for double_buffer in (True, False):
+            ga = make_algorithm(problem, population_size=10, mutation_rate=0.5, double_buffer=double_buffer)
+            population = ga.initialize_population(problem)
+            ga._evaluate_unscored(population)
+            ga._record_best(population)
+            best = ga.best.data.copy()
+            parents = [chromosome.data.copy() for chromosome in population]
+            children = ga.next_generation(population, problem)
+            for chromosome in children[ga.elite_size:]:
+                ga.mutate(chromosome, problem)
+            np.testing.assert_array_equal(ga.best.data, best)
+            if not double_buffer:
+                # The buffered path recycles the previous generation's rows
+                for chromosome, data in zip(population, parents):
+                    np.testing.assert_array_equal(chromosome.data, data)
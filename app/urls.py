@@ -11,6 +11,7 @@ urlpatterns = [
     path('instructor/login/', views.InstructorLoginView.as_view(), name='instructor_login'),
     path('instructor/dashboard/', views.instructor_dashboard, name='instructor_dashboard'),
     path('support/', views.support, name='support'),
+    path('timetable/', views.index, name='index'),
     
     # Generic auth views
     path('login/', auth_views.LoginView.as_view(template_name='auth/login.html'), name='login'),
@@ -20,4 +21,7 @@ urlpatterns = [
     path('signup/', views.signup, name='signup'),  # This will redirect to landing
     path('dashboard/', views.dashboard, name='dashboard'),
     path('send-timetable/', views.send_timetable_email, name='send_timetable'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('progress/<str:token>/', views.progress_stream, name='generation_progress'),
+    path('jobs/<str:token>/', views.generation_job, name='generation_job'),
 ]
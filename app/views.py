@@ -1,6 +1,10 @@
 from django.shortcuts import render
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from . models import *
 from datetime import datetime, timedelta
+import json
+import re
+import time
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
@@ -11,12 +15,16 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.contrib import messages
 from django.conf import settings
-from .algorithms.genetic_algorithm import GeneticTimetableAlgorithm
+from .algorithms.solvers import SOLVERS
+from .algorithms.metrics import REGISTRY
+from .algorithms.progress import read_progress
+from .jobs import submit, find_job, job_status
+from .revisions import current_revision, revision_entries
 from django.contrib.auth import login
 from django.views.generic import CreateView
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.views import LoginView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 
         # Get the current date
 today = datetime.now()
@@ -36,72 +44,43 @@ def index(request):
     semesters = TimeTableMain.objects.values_list('Semister', flat=True).distinct()
     years_of_study = TimeTableMain.objects.values_list('YearOfStudy', flat=True).distinct()
 
-    # Fetch selected Programme and its Department when a POST request is made
+    # Queue a generation for the selected Programme when a POST request is made
     if request.method == 'POST':
         try:
             programme = request.POST.get('programme')
             semester = request.POST.get('semester')
             year_of_study = request.POST.get('year_of_study')
-
-            # Use genetic algorithm to generate timetable
-            ga = GeneticTimetableAlgorithm(
-                population_size=50,
-                mutation_rate=0.1,
-                elite_size=2,
-                generations=100
+            timetable_main = TimeTableMain.objects.get(
+                Programme=programme,
+                Semister=semester,
+                YearOfStudy=year_of_study
             )
-            
-            try:
-                best_solution = ga.evolve(programme, semester, year_of_study)
-                
-                # Get the specific TimeTableMain instance
-                timetable_main = TimeTableMain.objects.get(
-                    Programme=programme,
-                    Semister=semester,
-                    YearOfStudy=year_of_study
-                )
-                
-                # Convert solution to timetable entries
-                timetable_entries = []
-                for gene in best_solution.genes:
-                    entry = TimeTable(
-                        CourseName=gene.course,
-                        Instructor=gene.instructor,
-                        Venue=gene.venue,
-                        Timestart=gene.time_start,
-                        TimeEnd=gene.time_end,
-                        Day=gene.day,
-                        Programme=timetable_main,
-                        SessionType=gene.session_type
-                    )
-                    timetable_entries.append(entry)
-
-                # Group entries by day
-                days = set(entry.Day for entry in timetable_entries)
-                timetable_data = {day: [] for day in days}
-                for entry in timetable_entries:
-                    timetable_data[entry.Day].append(entry)
-
-                context = {
-                    'programmes': programmes,
-                    'semesters': semesters,
-                    'years_of_study': years_of_study,
-                    'timetable_data': timetable_data,
-                    'selected_programme': programme,
-                    'department': timetable_main.Department,
-                    'monday': monday_formatted,
-                    'friday': friday_formatted,
-                    'current_year': current_year,
-                }
-                return render(request, 'pages/index.html', context)
-                
-            except Exception as e:
-                messages.error(request, f"Error generating timetable: {str(e)}")
-                
+
+            # Everyone but admins reads the stored timetable when there is one
+            revision = current_revision(timetable_main)
+            if revision is not None and not is_admin(request.user):
+                return redirect(f"{reverse('index')}?revision={revision.pk}")
+
+            # Admins may pick a solver backend per request and re-optimize the
+            # saved timetable; everyone else gets TIMETABLE_SOLVER
+            solver = request.POST.get('solver', '') if is_admin(request.user) else ''
+            if solver and solver not in SOLVERS:
+                raise ValueError(f"Unknown timetable solver: {solver}")
+            warm_start = is_admin(request.user) and bool(request.POST.get('warm_start'))
+            # A warm start moves the sessions of withdrawn instructors and
+            # closed venues; deactivated instructors are withdrawn anyway
+            withdrawn, closed = [], []
+            if warm_start:
+                withdrawn = [int(pk) for pk in request.POST.getlist('withdrawn_instructors') if pk.isdigit()]
+                closed = request.POST.getlist('closed_venues')
+
+            # The solve runs on a worker; the page polls the job until it is done
+            job = submit(timetable_main, solver, warm_start, withdrawn, closed)
+            return redirect(f"{reverse('index')}?job={job.Token}")
+
         except Exception as e:
             messages.error(request, f"Error processing request: {str(e)}")
 
-    # Default context for GET request or if POST fails
     context = {
         'programmes': programmes,
         'semesters': semesters,
@@ -111,12 +90,89 @@ def index(request):
         'monday': monday_formatted,
         'friday': friday_formatted,
         'current_year': current_year,
+        'solvers': SOLVERS,
+        'job': None,
     }
+    if is_admin(request.user):
+        context.update(instructors=Instructor.objects.select_related('user').filter(user__is_active=True),
+                       venues=Venue.objects.order_by('Venue'))
+
+    # A queued job shows its progress, a finished one its timetable
+    token = request.GET.get('job', '')
+    job = find_job(token) if PROGRESS_TOKEN.fullmatch(token) else None
+    revision = None
+    if job is not None:
+        context.update(job=job, selected_programme=job.Programme.Programme, department=job.Programme.Department)
+        if job.Status == GenerationJob.FINISHED:
+            revision = job.Revision
+        elif job.Status == GenerationJob.FAILED:
+            messages.error(request, f"Error generating timetable: {job.Error}")
+    elif request.GET.get('revision', '').isdigit():
+        revision = TimetableRevision.objects.select_related('Programme__Department').filter(
+            pk=request.GET['revision']).first()
+
+    if revision is not None:
+        timetable_main = revision.Programme
+        context.update(selected_programme=timetable_main.Programme, department=timetable_main.Department,
+                       revision=revision, timetable_data=by_day(revision_entries(revision)))
 
     return render(request, 'pages/index.html', context)
      
 
     
+PROGRESS_TOKEN = re.compile(r'[0-9a-f]{32}')
+
+
+def by_day(entries):
+    # Entries grouped by day, days in week order
+    timetable_data = {day: [] for day, label in DAY_CHOICES}
+    for entry in entries:
+        timetable_data.setdefault(entry.Day, []).append(entry)
+    return {day: day_entries for day, day_entries in timetable_data.items() if day_entries}
+
+
+def generation_job(request, token):
+    # Polled by the index page until the job is finished or failed
+    if not PROGRESS_TOKEN.fullmatch(token):
+        raise Http404
+    job = find_job(token)
+    if job is None:
+        raise Http404
+    return JsonResponse(job_status(job))
+
+
+def progress_stream(request, token):
+    # Server-Sent Events feed of a running generation, read from the cache
+    # the solver's CacheProgress writes to
+    if not PROGRESS_TOKEN.fullmatch(token):
+        raise Http404
+    interval = getattr(settings, 'TIMETABLE_PROGRESS_INTERVAL', 0.5)
+    timeout = getattr(settings, 'TIMETABLE_TIME_LIMIT', 20) * 2 + 10
+
+    def events():
+        last = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            event = read_progress(token)
+            if event is not None and event != last:
+                last = event
+                yield f"data: {json.dumps(event)}\n\n"
+                if event['stage'] == 'finished':
+                    return
+            time.sleep(interval)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def metrics(request):
+    # Prometheus scrape target for solver metrics, off unless enabled in settings
+    if not getattr(settings, 'TIMETABLE_METRICS_ENDPOINT', False):
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def support(request):
     return render(request, 'pages/support.html')
 
@@ -143,6 +199,7 @@ def send_timetable_email(request):
 
             # Get timetable entries for the selected day and programme
             timetable_entries = TimeTable.objects.filter(
+                PUBLISHED,
                 Day=day,
                 Programme__Programme=programme
             ).order_by('Timestart')
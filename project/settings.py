@@ -250,4 +250,36 @@ EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'your-actual-gmail@gmail.com'  # Replace with your Gmail
-EMAIL_HOST_PASSWORD = 'xxxx xxxx xxxx xxxx'  # The 16-digit app password you generated
\ No newline at end of file
+EMAIL_HOST_PASSWORD = 'xxxx xxxx xxxx xxxx'  # The 16-digit app password you generated
+
+# Progress events, solver results and their cache version are written by
+# one process (a web worker's job thread or run_generation_jobs) and read by
+# others, so the cache must be shared between processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+
+# Timetable generation
+TIMETABLE_TIME_LIMIT = 20  # seconds a single generation request may spend solving
+TIMETABLE_SOLVER = 'genetic'  # default backend: 'genetic', 'annealing' or 'tabu'
+TIMETABLE_SEED = 42  # seeded runs are deterministic and cached until their inputs change
+TIMETABLE_SOLVER_OPTIONS = {
+    'genetic': {
+        'population_size': 50,
+        'mutation_rate': 0.1,
+        'elite_size': 2,
+        'generations': 100,
+        'stall_generations': 30,  # stop after this many generations without improvement
+        'metrics': True,  # per-phase timings, logged by app.algorithms.metrics at INFO
+    },
+}
+TIMETABLE_PROGRESS_INTERVAL = 0.5  # seconds between progress events and SSE polls
+# Serve Prometheus text metrics at /metrics/. Totals are per process: each web
+# process reports the runs of its own job threads, and runs made by
+# manage.py run_generation_jobs never show up there (they are still logged).
+TIMETABLE_METRICS_ENDPOINT = False
+TIMETABLE_JOB_WORKERS = 2  # generation threads per web process; 0 leaves jobs to manage.py run_generation_jobs
+TIMETABLE_JOB_STALE_AFTER = 600  # seconds before a running job is presumed lost and identical requests start a new one